@@ -0,0 +1,107 @@
+import argparse
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from pathlib import Path
+
+import numpy as np
+from geoalchemy2.shape import from_shape
+from shapely import Point
+
+from internal.analyzer import GeoAnalyzer
+from internal.columnar import GridCells, SectorSet
+from internal.models import Square, Vertex
+from internal.sectors import SectorBuilder
+from pkg.logger import get_logger
+
+logger = get_logger(__name__)
+
+GEOJSON_DIR = Path(__file__).parent.parent.parent / "resources/geojson"
+
+
+def traced_memory() -> float:
+    return tracemalloc.get_traced_memory()[0] / 1024 ** 2
+
+
+def build_orm_grid(cells: GridCells) -> list:
+    grid = cells.to_model()
+    vertices = [
+        Vertex(grid=grid, i=int(i), j=int(j), point=from_shape(Point(x, y), srid=4326))
+        for i, j, (x, y) in zip(cells.vertex_i, cells.vertex_j, cells.vertex_coordinates)
+    ]
+    for index, (i, j, corners) in enumerate(zip(cells.i, cells.j, cells.corner_indices)):
+        a, b, c, d = (vertices[corner] for corner in corners)
+        Square(grid=grid, i=int(i), j=int(j), is_matching=bool(cells.is_matching[index]),
+               vertex_a=a, vertex_b=b, vertex_c=c, vertex_d=d)
+    return vertices
+
+
+def build_orm_sectors(vertices: list, sectors: SectorSet) -> list:
+    models = sectors.to_models()
+    for sector in models:
+        sector.polygon = from_shape(sector.polygon, srid=4326)
+        sector.vertex = vertices[sector.vertex_id]
+    return models
+
+
+def build_columnar_grid(cells: GridCells) -> tuple:
+    return cells.vertex_coordinates, cells.corner_indices, np.arange(cells.vertex_count, dtype=np.int64)
+
+
+def build_columnar_sectors(grid: tuple, sectors: SectorSet) -> SectorSet:
+    return replace(sectors, vertex_ids=grid[2][sectors.vertex_ids])
+
+
+def measure(model: str, geojson: str, grid_size: float, radius: float, angle: float) -> tuple:
+    analyzer = GeoAnalyzer(GEOJSON_DIR / geojson, None)
+    cells = analyzer.compute_grid(grid_size)
+    azimuths = [0, 120, 240]
+    matching = cells.matching_vertices
+    sectors = SectorSet(
+        vertex_ids=np.repeat(matching, len(azimuths)),
+        azimuths=np.tile(azimuths, len(matching)),
+        radius=radius,
+        angle=angle,
+        polygons=SectorBuilder(radius, angle).build(cells.vertex_coordinates[matching], azimuths)
+    )
+    build_grid, build_sectors = (build_orm_grid, build_orm_sectors) if model == "orm" else \
+        (build_columnar_grid, build_columnar_sectors)
+
+    tracemalloc.start()
+    baseline = traced_memory()
+    start = time.time()
+    grid = build_grid(cells)
+    grid_elapsed = time.time() - start
+    grid_memory = traced_memory()
+
+    start = time.time()
+    result = build_sectors(grid, sectors)
+    sectors_elapsed = time.time() - start
+    sectors_memory = traced_memory()
+    return (cells.vertex_count, len(result), grid_memory - baseline, grid_elapsed,
+            sectors_memory - grid_memory, sectors_elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare memory of ORM and columnar grid and sector results")
+    parser.add_argument("--geojson", default="UKR-ADM0_simplified.geojson")
+    parser.add_argument("--grid-size", type=float, default=4)
+    parser.add_argument("--radius", type=float, default=5)
+    parser.add_argument("--angle", type=float, default=60)
+    args = parser.parse_args()
+
+    for model in ("orm", "columnar"):
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            vertices, sectors, grid_memory, grid_elapsed, sectors_memory, sectors_elapsed = executor.submit(
+                measure, model, args.geojson, args.grid_size, args.radius, args.angle
+            ).result()
+        logger.info(f"{model} grid: {vertices} vertices in {grid_elapsed:.2f} seconds, "
+                    f"{grid_memory:.0f} MB ({grid_memory / vertices * 1e6:.0f} MB per million vertices)")
+        logger.info(f"{model} sectors: {sectors} sectors in {sectors_elapsed:.2f} seconds, "
+                    f"{sectors_memory:.0f} MB excluding the shared polygons "
+                    f"({sectors_memory / vertices * 1e6:.0f} MB per million vertices)")
+
+
+if __name__ == "__main__":
+    main()
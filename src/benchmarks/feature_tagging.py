@@ -0,0 +1,49 @@
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import shapely
+
+from internal.analyzer import GeoAnalyzer
+from internal.boundary import boundaries
+from pkg.logger import get_logger
+
+logger = get_logger(__name__)
+
+GEOJSON_DIR = Path(__file__).parent.parent.parent / "resources/geojson"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tag grid vertices with the administrative region containing them")
+    parser.add_argument("--geojson", default="UKR-ADM0_simplified.geojson")
+    parser.add_argument("--regions", nargs="+", default=["UKR-ADM1_simplified.geojson", "UKR-ADM2.geojson"])
+    parser.add_argument("--grid-size", type=float, default=2)
+    args = parser.parse_args()
+
+    analyzer = GeoAnalyzer(GEOJSON_DIR / args.geojson, None)
+    cells = analyzer.lattice(args.grid_size)
+    coordinates = cells.vertex_coordinates
+    points = shapely.points(coordinates)
+
+    for regions in args.regions:
+        store = boundaries.load(GEOJSON_DIR / regions).features
+
+        start = time.time()
+        expected = np.full(len(points), -1, dtype=np.int64)
+        for index in reversed(range(len(store))):
+            expected[shapely.contains(store.geometries[index], points)] = index
+        per_feature = time.time() - start
+
+        start = time.time()
+        regions_index = store.locate(coordinates)
+        indexed = time.time() - start
+
+        tagged = np.count_nonzero(regions_index >= 0)
+        logger.info(f"{regions}: {len(coordinates)} vertices, {tagged} tagged across {len(store)} features, "
+                    f"per-feature scan {per_feature:.2f} s, STRtree {indexed:.2f} s, "
+                    f"identical: {np.array_equal(expected, regions_index)}")
+
+
+if __name__ == "__main__":
+    main()
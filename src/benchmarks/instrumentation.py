@@ -0,0 +1,52 @@
+import argparse
+import time
+
+from sqlalchemy import create_engine, text
+
+from pkg.config import settings
+from pkg.logger import get_logger
+from pkg.metrics import instrument_engine, registry, timer
+
+logger = get_logger(__name__)
+
+
+def measure_timer(iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        with timer("benchmark"):
+            pass
+    return (time.perf_counter() - start) / iterations
+
+
+def measure_statements(iterations: int) -> float:
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    with engine.connect() as connection:
+        statement = text("SELECT 1")
+        start = time.perf_counter()
+        for _ in range(iterations):
+            connection.execute(statement)
+        return (time.perf_counter() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the per-call cost of the metrics instrumentation")
+    parser.add_argument("--iterations", type=int, default=200000)
+    parser.add_argument("--statements", type=int, default=50000)
+    args = parser.parse_args()
+
+    results = {}
+    for enabled in (False, True):
+        settings.METRICS_ENABLED = enabled
+        results[enabled] = measure_timer(args.iterations), measure_statements(args.statements)
+        state = "enabled" if enabled else "disabled"
+        logger.info(f"Instrumentation {state}: {results[enabled][0] * 1e9:.0f} ns per timed block, "
+                    f"{results[enabled][1] * 1e6:.1f} us per SQL statement")
+
+    logger.info(f"Enabled overhead: {(results[True][0] - results[False][0]) * 1e9:.0f} ns per timed block, "
+                f"{(results[True][1] - results[False][1]) * 1e6:.1f} us per SQL statement")
+    logger.info(f"Collected metrics:\n{registry.report()}")
+
+
+if __name__ == "__main__":
+    main()
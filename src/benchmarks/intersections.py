@@ -0,0 +1,57 @@
+import argparse
+import time
+from pathlib import Path
+
+from sqlalchemy import text
+
+from internal.analyzer import GeoAnalyzer
+from internal.database import DatabaseConnector
+from internal.intersection import IntersectionEngine
+from pkg.config import settings
+from pkg.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare in-process and PostGIS sector/vertex intersection")
+    parser.add_argument("--geojson", default="UKR-ADM1_simplified.geojson")
+    parser.add_argument("--grid-size", type=float, default=25)
+    parser.add_argument("--radius", type=int, default=50)
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument(
+        "--database-url",
+        default=f"postgresql+psycopg2://{settings.POSTGRES_USER}:{settings.POSTGRES_PASSWORD}"
+                f"@localhost/{settings.POSTGRES_DB}",
+        help="throwaway PostGIS database to benchmark against (default: the application database)"
+    )
+    args = parser.parse_args()
+
+    db = DatabaseConnector(args.database_url)
+    analyzer = GeoAnalyzer(Path(__file__).parent.parent.parent / "resources/geojson" / args.geojson, db)
+    grid = analyzer.generate_grid(args.grid_size)
+    try:
+        vertex_ids, vertex_coordinates = db.get_vertex_arrays(grid.id)
+        sectors = analyzer.generate_sectors(vertex_ids, vertex_coordinates, radius=args.radius)
+
+        start = time.time()
+        sector_ids, _ = IntersectionEngine(vertex_ids, vertex_coordinates).intersect(sectors.ids, sectors.polygons)
+        logger.info(f"In-process STRtree: {len(sector_ids)} pairs in {time.time() - start:.2f} seconds")
+
+        for workers in sorted({1, args.workers}):
+            with db.engine.begin() as connection:
+                connection.execute(text(
+                    "DELETE FROM sector_vertex_intersections "
+                    "WHERE vertex_id IN (SELECT id FROM vertices WHERE grid_id = :grid_id)"
+                ), {"grid_id": grid.id})
+            start = time.time()
+            inserted = db.compute_intersections(grid.id, chunk_size=args.chunk_size, workers=workers)
+            logger.info(f"PostGIS INSERT ... SELECT with {workers} workers: {inserted} pairs "
+                        f"in {time.time() - start:.2f} seconds")
+    finally:
+        db.delete_grid(grid.id)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import shapely
+from geoalchemy2.shape import from_shape
+from shapely import Point
+
+from internal.analyzer import GeoAnalyzer
+from internal.columnar import SectorSet
+from internal.intersection import IntersectionEngine, LatticeIntersectionEngine
+from internal.models import Sector, Vertex
+from internal.sectors import SectorBuilder
+from pkg.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def check_with_models(sectors: SectorSet, vertex_ids: np.ndarray, vertex_coordinates: np.ndarray,
+                      pairs: set, samples: int, seed: int = 0) -> int:
+    rng = np.random.default_rng(seed)
+    tree = shapely.STRtree(shapely.points(vertex_coordinates))
+    mismatches = 0
+    for index in rng.choice(len(sectors), min(samples, len(sectors)), replace=False).tolist():
+        polygon = sectors.polygons[index]
+        sector = Sector(id=int(sectors.ids[index]), polygon=from_shape(polygon, srid=4326))
+        for position in tree.query(shapely.envelope(shapely.buffer(polygon, 0.01))).tolist():
+            x, y = vertex_coordinates[position]
+            vertex = Vertex(id=int(vertex_ids[position]), point=from_shape(Point(x, y), srid=4326))
+            expected = sector.check_vertex_intersection(vertex)
+            mismatches += expected != ((sector.id, vertex.id) in pairs)
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare lattice-arithmetic and STRtree sector intersection")
+    parser.add_argument("--geojson", default="UKR-ADM0_simplified.geojson")
+    parser.add_argument("--grid-size", type=float, default=5)
+    parser.add_argument("--radius", type=float, default=5)
+    parser.add_argument("--angle", type=float, default=60)
+    parser.add_argument("--azimuths", type=float, nargs="+", default=[0, 120, 240])
+    parser.add_argument("--model-samples", type=int, default=200)
+    args = parser.parse_args()
+
+    analyzer = GeoAnalyzer(Path(__file__).parent.parent.parent / "resources/geojson" / args.geojson, None)
+    cells = analyzer.compute_grid(args.grid_size)
+    matching = cells.matching_vertices
+    vertex_ids, vertex_coordinates = matching + 1, cells.vertex_coordinates[matching]
+    sectors = SectorSet(
+        vertex_ids=np.repeat(vertex_ids, len(args.azimuths)),
+        azimuths=np.tile(args.azimuths, len(vertex_ids)),
+        radius=args.radius,
+        angle=args.angle,
+        polygons=SectorBuilder(args.radius, args.angle, templates=analyzer.sector_templates).build(
+            vertex_coordinates, args.azimuths
+        ),
+        ids=np.arange(1, len(vertex_ids) * len(args.azimuths) + 1)
+    )
+
+    start = time.time()
+    expected = IntersectionEngine(vertex_ids, vertex_coordinates).intersect(sectors.ids, sectors.polygons)
+    tree_elapsed = time.time() - start
+
+    engine = LatticeIntersectionEngine(cells, vertex_ids, vertex_coordinates)
+    start = time.time()
+    actual = engine.intersect_sector_set(sectors)
+    lattice_elapsed = time.time() - start
+
+    start = time.time()
+    centers = np.repeat(vertex_coordinates, len(args.azimuths), axis=0)
+    analytic = engine.intersect(sectors.ids, centers, sectors.azimuths, sectors.radius, sectors.angle)
+    analytic_elapsed = time.time() - start
+
+    expected_pairs = set(zip(*(values.tolist() for values in expected)))
+    actual_pairs = set(zip(*(values.tolist() for values in actual)))
+    analytic_pairs = set(zip(*(values.tolist() for values in analytic)))
+    logger.info(f"{len(sectors)} sectors, {len(expected_pairs)} pairs")
+    logger.info(f"STRtree over polygons: {tree_elapsed:.2f} seconds")
+    logger.info(f"Lattice with stored polygons: {lattice_elapsed:.2f} seconds, "
+                f"identical: {expected_pairs == actual_pairs}")
+    logger.info(f"Lattice without polygons: {analytic_elapsed:.2f} seconds, {engine.fallbacks} boundary candidates, "
+                f"identical: {expected_pairs == analytic_pairs}")
+    mismatches = check_with_models(sectors, vertex_ids, vertex_coordinates, actual_pairs, args.model_samples)
+    logger.info(f"Sector.check_vertex_intersection on {args.model_samples} sampled sectors: {mismatches} mismatches")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import argparse
+import json
+import logging
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+import numpy as np
+import requests
+from werkzeug.serving import make_server
+
+from internal.jobs import JobStatus
+from pkg.logger import get_logger
+from web.app import app, db, jobs, tile_cache
+
+logger = get_logger(__name__)
+
+UKRAINE_BOUNDS = (22.1, 44.3, 40.3, 52.4)
+
+
+def tile_range(bounds: Tuple[float, float, float, float], z: int) -> List[Tuple[int, int, int]]:
+    def tile(lon: float, lat: float) -> Tuple[int, int]:
+        n = 2 ** z
+        x = int((lon + 180) / 360 * n)
+        y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+        return x, y
+
+    min_x, max_y = tile(bounds[0], bounds[1])
+    max_x, min_y = tile(bounds[2], bounds[3])
+    return [(z, x, y) for x in range(min_x, max_x + 1) for y in range(min_y, max_y + 1)]
+
+
+def run_clients(url: str, tiles: List[Tuple[int, int, int]], grid_id: int, threads: int,
+                duration: float) -> Tuple[int, int, np.ndarray]:
+    deadline = time.perf_counter() + duration
+    layers = ["squares", "vertices", "sectors"]
+
+    def client(seed: int) -> Tuple[int, List[float]]:
+        rng = random.Random(seed)
+        errors, latencies = 0, []
+        with requests.Session() as session:
+            while time.perf_counter() < deadline:
+                z, x, y = rng.choice(tiles)
+                start = time.perf_counter()
+                response = session.get(f"{url}/tiles/{rng.choice(layers)}/{z}/{x}/{y}.pbf", params={"grid": grid_id})
+                latencies.append(time.perf_counter() - start)
+                errors += response.status_code != 200
+        return errors, latencies
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(client, range(threads)))
+    latencies = np.concatenate([np.asarray(latencies) for _, latencies in results])
+    return len(latencies), sum(errors for errors, _ in results), latencies
+
+
+def follow_events(session: requests.Session, events_url: str) -> Dict:
+    state = {}
+    with session.get(events_url, stream=True) as response:
+        for line in response.iter_lines(decode_unicode=True):
+            if line and line.startswith("data: "):
+                state = json.loads(line[len("data: "):])
+    return state
+
+
+def run_job_clients(url: str, map_requests: List[Dict], threads: int,
+                    duration: float) -> Tuple[int, int, int, Dict[str, np.ndarray]]:
+    deadline = time.perf_counter() + duration
+
+    def client(seed: int) -> Tuple[int, int, Dict[str, List[float]]]:
+        rng = random.Random(seed)
+        errors, built, latencies = 0, 0, {"submit": [], "complete": [], "map": []}
+        with requests.Session() as session:
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                response = session.post(f"{url}/jobs", data=rng.choice(map_requests))
+                latencies["submit"].append(time.perf_counter() - start)
+                if response.status_code not in (200, 202):
+                    errors += 1
+                    continue
+                job = response.json()
+                if "events_url" in job:
+                    built += 1
+                    job = follow_events(session, url + job["events_url"])
+                    latencies["complete"].append(time.perf_counter() - start)
+                if job.get("status") != JobStatus.DONE.value:
+                    errors += 1
+                    continue
+
+                start = time.perf_counter()
+                response = session.get(url + job["result"])
+                latencies["map"].append(time.perf_counter() - start)
+                errors += response.status_code != 200
+        return errors, built, latencies
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(client, range(threads)))
+    latencies = {
+        name: np.concatenate([np.asarray(client_latencies[name]) for _, _, client_latencies in results])
+        for name in ["submit", "complete", "map"]
+    }
+    return (len(latencies["submit"]), sum(errors for errors, _, _ in results), sum(built for _, built, _ in results),
+            latencies)
+
+
+def _percentiles(latencies: np.ndarray) -> str:
+    if not len(latencies):
+        return "no requests"
+    return (f"p50 {np.percentile(latencies, 50) * 1000:.1f} ms, "
+            f"p95 {np.percentile(latencies, 95) * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure tile and map job throughput of the Flask app")
+    parser.add_argument("--scenarios", nargs="+", choices=["tiles", "jobs"], default=["tiles", "jobs"])
+    parser.add_argument("--grid-id", type=int, help="grid to request tiles of, the latest grid by default")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--zooms", type=int, nargs="+", default=[8, 9, 10])
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--tile-cache", action="store_true", help="keep the in-process tile cache enabled")
+    parser.add_argument("--geojson", default="UKR-ADM0_simplified.geojson", help="border to request map jobs of")
+    parser.add_argument("--job-grid-sizes", type=int, nargs="+", default=[30, 25, 20],
+                        help="grid sizes of the map jobs; the first job of each size builds the map, "
+                             "later ones are served from the map cache")
+    parser.add_argument("--job-radius", type=int, default=10)
+    parser.add_argument("--persist-jobs", action="store_true", help="build job maps in PostGIS instead of previews")
+    args = parser.parse_args()
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    if not args.tile_cache:
+        tile_cache.max_entries = 0
+    grid_id = args.grid_id
+    if "tiles" in args.scenarios and grid_id is None:
+        grids = db.get_all_grids()
+        if not grids:
+            logger.error("No grids in the database, generate one first")
+            return
+        grid_id = max(grid.id for grid in grids)
+        db.remove_session()
+
+    server = make_server("127.0.0.1", args.port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{args.port}"
+
+    try:
+        if "tiles" in args.scenarios:
+            tiles = [tile for z in args.zooms for tile in tile_range(UKRAINE_BOUNDS, z)]
+            logger.info(f"Requesting {len(tiles)} tiles of grid {grid_id} for {args.duration:.0f} seconds per run")
+            baseline = None
+            for threads in args.threads:
+                requests_done, errors, latencies = run_clients(url, tiles, grid_id, threads, args.duration)
+                throughput = requests_done / args.duration
+                baseline = baseline or throughput
+                logger.info(f"{threads} threads: {throughput:.1f} requests/s ({throughput / baseline:.2f}x), "
+                            f"{_percentiles(latencies)}, {errors} errors, {db.engine.pool.status()}")
+
+        if "jobs" in args.scenarios:
+            map_requests = [
+                {"geojson": args.geojson, "gridSize": grid_size, "sectorRadius": args.job_radius,
+                 **({} if args.persist_jobs else {"preview": "1"})}
+                for grid_size in args.job_grid_sizes
+            ]
+            logger.info(f"Submitting map jobs of {args.geojson} at {args.job_grid_sizes} km "
+                        f"for {args.duration:.0f} seconds per run")
+            for threads in args.threads:
+                jobs_done, errors, built, latencies = run_job_clients(url, map_requests, threads, args.duration)
+                logger.info(f"{threads} threads: {jobs_done / args.duration:.1f} jobs/s, {built} waited for a build, "
+                            f"{jobs_done - built} cached, {errors} errors")
+                logger.info(f"{threads} threads: submit {_percentiles(latencies['submit'])}; "
+                            f"progress stream until done {_percentiles(latencies['complete'])}; "
+                            f"map {_percentiles(latencies['map'])}")
+    finally:
+        server.shutdown()
+        jobs.shutdown()
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import shapely
+
+from internal.analyzer import GeoAnalyzer
+from internal.quadtree import QuadtreeClassifier
+from pkg.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare quadtree and per-cell grid classification")
+    parser.add_argument("--geojson", nargs="+",
+                        default=["UKR-ADM0_simplified.geojson", "UKR-ADM1_simplified.geojson", "UKR-ADM2.geojson"])
+    parser.add_argument("--grid-sizes", type=float, nargs="+", default=[10, 5, 2])
+    parser.add_argument("--leaf-size", type=int, default=4)
+    args = parser.parse_args()
+
+    for geojson in args.geojson:
+        analyzer = GeoAnalyzer(Path(__file__).parent.parent.parent / "resources/geojson" / geojson, None)
+        for grid_size in args.grid_sizes:
+            cells = analyzer.lattice(grid_size)
+
+            start = time.time()
+            expected = shapely.contains(analyzer._COMBINED_AREA, cells.boxes)
+            per_cell = time.time() - start
+
+            classifier = QuadtreeClassifier(analyzer._COMBINED_AREA, args.leaf_size)
+            start = time.time()
+            is_matching = classifier.classify(cells)
+            quadtree = time.time() - start
+
+            stats = classifier.stats
+            logger.info(f"{geojson} {grid_size} km: {len(cells)} squares, per-cell {per_cell:.2f} s, "
+                        f"quadtree {quadtree:.2f} s, {stats.geos_calls} geometric tests "
+                        f"({stats.block_tests} block, {stats.cell_tests} cell, "
+                        f"{len(cells) - stats.geos_calls} saved), identical: {np.array_equal(expected, is_matching)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import argparse
+import time
+from pathlib import Path
+
+from internal.analyzer import GeoAnalyzer
+from internal.sectors import SectorBuilder, SectorTemplateCache, distance_error
+from pkg.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare exact and template-based sector generation")
+    parser.add_argument("--geojson", default="UKR-ADM0_simplified.geojson")
+    parser.add_argument("--grid-size", type=float, default=1)
+    parser.add_argument("--radius", type=float, nargs="+", default=[5, 20, 100])
+    parser.add_argument("--angle", type=float, default=60)
+    parser.add_argument("--max-band", type=float, default=0.01)
+    parser.add_argument("--max-error", type=float, default=1)
+    parser.add_argument("--chunk-size", type=int, default=100000)
+    args = parser.parse_args()
+
+    analyzer = GeoAnalyzer(Path(__file__).parent.parent.parent / "resources/geojson" / args.geojson, None)
+    cells = analyzer.compute_grid(args.grid_size)
+    coordinates = cells.vertex_coordinates[cells.matching_vertices]
+    azimuths = [0, 120, 240]
+    logger.info(f"{len(coordinates)} matching vertices, {len(coordinates) * len(azimuths)} sectors")
+
+    for radius in args.radius:
+        templates = SectorTemplateCache(max_error=args.max_error, max_band=args.max_band)
+        exact_builder = SectorBuilder(radius, args.angle)
+        template_builder = SectorBuilder(radius, args.angle, templates=templates)
+        exact_elapsed, template_elapsed, max_error = 0, 0, 0
+        for start in range(0, len(coordinates), args.chunk_size):
+            chunk = coordinates[start:start + args.chunk_size]
+
+            timer = time.time()
+            exact = exact_builder.arcs(chunk, azimuths)
+            exact_elapsed += time.time() - timer
+
+            timer = time.time()
+            approximate = template_builder.arcs(chunk, azimuths)
+            template_elapsed += time.time() - timer
+
+            error = distance_error(approximate[..., 0], approximate[..., 1], exact[..., 0], exact[..., 1])
+            max_error = max(max_error, error.max())
+
+        logger.info(f"Radius {radius:g} km: exact arcs {exact_elapsed:.2f} seconds, template arcs "
+                    f"{template_elapsed:.2f} seconds ({exact_elapsed / template_elapsed:.1f}x speedup)")
+        logger.info(f"Radius {radius:g} km: {len(templates)} templates, {templates.fallbacks} fell back to exact, "
+                    f"band {templates.band_width(radius, abs(coordinates[:, 1]).max()):g} degrees, "
+                    f"maximum deviation {max_error:.3f} m (bound {args.max_error} m)")
+
+if __name__ == "__main__":
+    main()
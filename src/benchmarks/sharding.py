@@ -0,0 +1,42 @@
+import argparse
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+from internal.analyzer import GeoAnalyzer
+from internal.sharding import ShardedPipeline
+from pkg.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure sharded pipeline scaling from 1 to N cores")
+    parser.add_argument("--geojson", default="UKR-ADM1_simplified.geojson")
+    parser.add_argument("--grid-size", type=float, default=5)
+    parser.add_argument("--radius", type=float, default=5)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    analyzer = GeoAnalyzer(Path(__file__).parent.parent.parent / "resources/geojson" / args.geojson, None)
+    lattice = analyzer.lattice(args.grid_size)
+
+    baseline, reference = None, None
+    for workers in range(1, args.max_workers + 1):
+        pipeline = ShardedPipeline(analyzer._COMBINED_AREA, workers)
+        start = time.time()
+        cells, sectors, sector_index, vertex_index = pipeline.run(lattice, radius=args.radius)
+        elapsed = time.time() - start
+
+        result = (cells.is_matching, sectors.vertex_ids, sector_index, vertex_index)
+        if reference is None:
+            baseline, reference = elapsed, result
+        identical = all(np.array_equal(a, b) for a, b in zip(result, reference))
+        logger.info(f"{workers} workers: {elapsed:.2f} seconds, {baseline / elapsed:.2f}x speedup, "
+                    f"{len(sectors)} sectors, {len(sector_index)} intersections, identical: {identical}")
+
+
+if __name__ == "__main__":
+    main()
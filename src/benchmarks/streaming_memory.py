@@ -0,0 +1,51 @@
+import argparse
+import resource
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from internal.analyzer import GeoAnalyzer
+from internal.sharding import ShardedPipeline
+from pkg.logger import get_logger
+
+logger = get_logger(__name__)
+
+GEOJSON_DIR = Path(__file__).parent.parent.parent / "resources/geojson"
+
+
+def measure(geojson: str, grid_size: float, radius: float, chunk_size: int | None) -> tuple:
+    analyzer = GeoAnalyzer(GEOJSON_DIR / geojson, None)
+    cells = analyzer.lattice(grid_size)
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    if chunk_size:
+        pipeline = ShardedPipeline(analyzer._COMBINED_AREA, 1, strip_columns=max(1, chunk_size // cells.rows))
+        sectors = sum(len(strip.sector_polygons) for strip in pipeline.iter_strips(cells, radius=radius))
+    else:
+        sectors = len(ShardedPipeline(analyzer._COMBINED_AREA, 1).run(cells, radius=radius)[1])
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return len(cells), sectors, (peak - baseline) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare peak memory of streaming and in-memory grid pipelines")
+    parser.add_argument("--geojson", default="UKR-ADM0_simplified.geojson")
+    parser.add_argument("--grid-sizes", type=float, nargs="+", default=[4, 2, 1])
+    parser.add_argument("--radius", type=float, default=5)
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--compare-in-memory", action="store_true")
+    args = parser.parse_args()
+
+    for grid_size in args.grid_sizes:
+        for chunk_size in (args.chunk_size, None) if args.compare_in_memory else (args.chunk_size,):
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                squares, sectors, peak = executor.submit(
+                    measure, args.geojson, grid_size, args.radius, chunk_size
+                ).result()
+            mode = f"streaming ({chunk_size} squares per chunk)" if chunk_size else "in-memory"
+            logger.info(f"{grid_size} km, {mode}: {squares} squares, {sectors} sectors, "
+                        f"peak memory growth {peak:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
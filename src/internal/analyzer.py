@@ -1,36 +1,49 @@
-import json
 import math
 import time
 from pathlib import Path
-from typing import List, Tuple
-
-import geopandas as gpd
-from shapely import Polygon, Point
-from shapely.geometry import shape
-
-from internal.database import DatabaseConnector
-from internal.models import Feature, Direction, ExtremePoint, Grid, Square, Vertex, Sector
+from typing import Dict, List, Tuple
+
+import numpy as np
+import shapely
+from shapely import Point
+
+from internal.boundary import boundaries
+from internal.features import FeatureStore
+from internal.columnar import GridCells, SectorSet
+from internal.models import (BoundarySummary, Feature, Direction, ExtremePoint, Grid, PipelineStage, Square,
+                             Vertex, Sector)
+from internal.quadtree import QuadtreeClassifier
+from internal.sectors import SectorBuilder, SectorTemplateCache
+from internal.sharding import ShardedPipeline, halo_columns
+from internal.storage import StorageBackend
 from pkg.config import CENTER_LON, CENTER_LAT, EARTH_RADIUS
 from pkg.logger import get_logger
+from pkg.metrics import timed
 
 logger = get_logger(__name__)
 
+SIMPLIFY_RATIO = 20
+
 
 class GeoAnalyzer:
-    def __init__(self, geojson_file: Path, db: DatabaseConnector):
+    def __init__(self, geojson_file: Path, db: StorageBackend):
         self.db = db
         self._GEOJSON_FILE = geojson_file
-        self._GDF = gpd.read_file(self._GEOJSON_FILE)
-        self._GDF["geometry"] = self._GDF["geometry"].apply(lambda geom: geom.buffer(0) if not geom.is_valid else geom)
-        self._COMBINED_AREA = self._GDF.unary_union
+        self._BOUNDARY = boundaries.load(self._GEOJSON_FILE)
+        self._COMBINED_AREA = self._BOUNDARY.area
+        self.sector_templates = SectorTemplateCache()
 
     @property
     def borders(self):
-        return self._GDF.to_json()
+        return self._BOUNDARY.gdf.to_json()
+
+    @property
+    def summary(self) -> BoundarySummary:
+        return self._BOUNDARY.summary
 
     @property
     def bounds(self) -> Tuple[float, float, float, float]:
-        return self._COMBINED_AREA.bounds
+        return self._BOUNDARY.bounds
 
     @property
     def center_point(self) -> Point:
@@ -38,85 +51,65 @@ class GeoAnalyzer:
 
     @property
     def extreme_points(self) -> Tuple[ExtremePoint, ExtremePoint, ExtremePoint, ExtremePoint]:
-        return (
-            self.get_extreme_point(Direction.NORTH),
-            self.get_extreme_point(Direction.SOUTH),
-            self.get_extreme_point(Direction.WEST),
-            self.get_extreme_point(Direction.EAST)
-        )
+        return self.summary.extreme_points
+
+    @property
+    def feature_store(self) -> FeatureStore:
+        return self._BOUNDARY.features
 
     @property
     def features(self) -> List[Feature]:
-        with open(self._GEOJSON_FILE, "r", encoding="utf-8") as file:
-            geojson_data = json.load(file)
-
-        features = []
-        for feature in geojson_data["features"]:
-            properties: dict = feature.get("properties")
-            name = None
-            if properties:
-                for key in properties.keys():
-                    if "name" in key.lower():
-                        name = properties.get(key)
-                        break
-            features.append(Feature(name=name, multi_polygon=shape(feature["geometry"])))
-
-        return features
+        return self.feature_store.features()
+
+    def tag_vertices(self, cells: GridCells, geojson_file: Path = None) -> np.ndarray:
+        store = boundaries.load(geojson_file).features if geojson_file else self.feature_store
+        return store.tag(cells.vertex_coordinates)
 
     def get_extreme_point(self, direction: Direction) -> ExtremePoint:
-        if self._COMBINED_AREA.geom_type == "MultiPolygon":
-            polygons = list(self._COMBINED_AREA.geoms)
-        else:
-            polygons = [self._COMBINED_AREA]
-
-        all_coords = []
-        for polygon in polygons:
-            if polygon.exterior:
-                all_coords.extend(list(polygon.exterior.coords))
-
-        max_lat = max(all_coords, key=lambda x: x[1])
-        min_lat = min(all_coords, key=lambda x: x[1])
-        max_lon = max(all_coords, key=lambda x: x[0])
-        min_lon = min(all_coords, key=lambda x: x[0])
-
-        if direction == Direction.NORTH:
-            return ExtremePoint(Direction.NORTH, Point(max_lat[0], max_lat[1]))
-        elif direction == Direction.SOUTH:
-            return ExtremePoint(Direction.SOUTH, Point(min_lat[0], min_lat[1]))
-        elif direction == Direction.WEST:
-            return ExtremePoint(Direction.WEST, Point(min_lon[0], min_lon[1]))
-        elif direction == Direction.EAST:
-            return ExtremePoint(Direction.EAST, Point(max_lon[0], max_lon[1]))
+        return self.summary.extreme_point(direction)
 
-    def generate_grid(self, grid_size: float) -> Grid:
-        grid = Grid(size=grid_size)
-        grid_id = self.db.create_grid(grid)
+    def lattice(self, grid_size: float) -> GridCells:
         grid_size_x, grid_size_y = grid_size / 111, grid_size / (111 / math.cos(math.radians(CENTER_LAT)))
-        min_x, min_y, max_x, max_y = self._COMBINED_AREA.bounds
-        x = min_x
+        min_x, min_y, max_x, max_y = self.bounds
+        columns = int(math.ceil((max_x - min_x) / grid_size_x))
+        rows = int(math.ceil((max_y - min_y) / grid_size_y))
+        return GridCells(
+            size=grid_size,
+            origin_x=min_x,
+            origin_y=min_y,
+            step_x=grid_size_x,
+            step_y=grid_size_y,
+            columns=columns,
+            rows=rows,
+            is_matching=np.empty(0, dtype=bool)
+        )
+
+    @timed("compute_grid")
+    def compute_grid(self, grid_size: float, simplified: bool = False) -> GridCells:
+        cells = self.lattice(grid_size)
+        area = self._COMBINED_AREA
+        if simplified:
+            area = self._BOUNDARY.simplified(min(cells.step_x, cells.step_y) / SIMPLIFY_RATIO)
+        classifier = QuadtreeClassifier(area)
+        start = time.time()
+        cells.is_matching = classifier.classify(cells)
+        end = time.time()
+        logger.info(f"Grid classification of {len(cells)} squares took {end - start:.2f} seconds "
+                    f"and {classifier.stats.geos_calls} geometric tests")
+        return cells
+
+    @timed("save_grid")
+    def save_grid(self, cells: GridCells, stage: PipelineStage = None) -> Grid:
+        grid = cells.to_model()
         start = time.time()
-        while x < max_x:
-            y = min_y
-            while y < max_y:
-                a = Point(x, y)
-                b = Point(x + grid_size_x, y)
-                c = Point(x + grid_size_x, y + grid_size_y)
-                d = Point(x, y + grid_size_y)
-                square = Polygon([a, b, c, d, a])
-                if square.within(self._COMBINED_AREA):
-                    square_id = self.db.create_square(Square(grid_id=grid_id))
-                else:
-                    square_id = self.db.create_square(Square(grid_id=grid_id, is_matching=False))
-
-                for point in [a, b, c, d]:
-                    self.db.create_vertex(Vertex(square_id=square_id, point=point))
-
-                y += grid_size_y
-            x += grid_size_x
+        self.db.bulk_insert_grid(grid, cells, stage=stage)
         end = time.time()
-        logger.info(f"Grid generation took {end - start:.2f} seconds")
+        logger.info(f"Grid persistence took {end - start:.2f} seconds")
         return grid
 
+    def generate_grid(self, grid_size: float) -> Grid:
+        return self.save_grid(self.compute_grid(grid_size))
+
     @staticmethod
     def _find_point_on_sphere(center: Point, azimuth: int, distance: int = 5) -> Point:
         lat1 = math.radians(center.y)
@@ -139,19 +132,13 @@ class GeoAnalyzer:
         return Point(lon2, lat2)
 
     def generate_sector_for_vertex(self, vertex: Vertex, azimuth: int, radius: int = 5, angle: int = 60) -> Sector:
-        points = []
-        half_angle = int(angle / 2)
-        for offset in range(-half_angle, half_angle + 1, 1):
-            point = self._find_point_on_sphere(vertex.shapely_point, azimuth + offset, radius)
-            points.append(point)
-
+        point = vertex.shapely_point
         sector = Sector(
             vertex_id=vertex.id,
             azimuth=azimuth,
             radius=radius,
             angle=angle,
-            polygon=Polygon([(vertex.shapely_point.x, vertex.shapely_point.y)] + points +
-                            [(vertex.shapely_point.x, vertex.shapely_point.y)])
+            polygon=SectorBuilder(radius, angle).build([(point.x, point.y)], [azimuth])[0]
         )
         self.db.create_sector(sector)
         return sector
@@ -175,12 +162,120 @@ class GeoAnalyzer:
 
         return sectors
 
-    def generate_sectors_for_squares(self, squares: List[Square], azimuths: List[int] = None,
-                                     radius: int = 5, angle: int = 60) -> List[Sector]:
-        sectors = []
+    @timed("generate_sectors")
+    def generate_sectors(self, vertex_ids: np.ndarray, vertex_coordinates: np.ndarray, azimuths: List[int] = None,
+                         radius: int = 5, angle: int = 60, resolution: float = 1, stage_id: int = None) -> SectorSet:
+        if not azimuths:
+            azimuths = [0, 120, 240]
         start = time.time()
-        for square in squares:
-            sectors.extend(self.generate_sectors_for_square(square, azimuths, radius, angle))
+        sectors = SectorSet(
+            vertex_ids=np.repeat(vertex_ids, len(azimuths)),
+            azimuths=np.tile(azimuths, len(vertex_ids)),
+            radius=radius,
+            angle=angle,
+            polygons=SectorBuilder(radius, angle, resolution, self.sector_templates).build(
+                vertex_coordinates, azimuths
+            ),
+            stage_id=stage_id
+        )
         end = time.time()
-        logger.info(f"Sectors generation took {end - start:.2f} seconds")
+        logger.info(f"Sectors generation of {len(sectors)} sectors took {end - start:.2f} seconds")
+
+        if self.db is None:
+            sectors.ids = np.arange(len(sectors), dtype=np.int64)
+        else:
+            sectors.ids = self.db.bulk_insert_sectors(sectors)
         return sectors
+
+    def generate_sectors_for_squares(self, squares: List[Square], azimuths: List[int] = None,
+                                     radius: int = 5, angle: int = 60) -> SectorSet:
+        vertices = {vertex.id: vertex for square in squares for vertex in square.vertices}
+        vertex_ids = np.fromiter(vertices.keys(), dtype=np.int64, count=len(vertices))
+        vertex_coordinates = shapely.get_coordinates(
+            shapely.from_wkb([bytes(vertex.point.data) for vertex in vertices.values()])
+        )
+        return self.generate_sectors(vertex_ids, vertex_coordinates, azimuths, radius, angle)
+
+    @timed("generate_sharded")
+    def generate_sharded(self, grid_size: float, azimuths: List[int] = None, radius: int = 5, angle: int = 60,
+                         workers: int = None) -> Tuple[Grid, SectorSet]:
+        pipeline = ShardedPipeline(self._COMBINED_AREA, workers)
+        cells, sectors, sector_index, vertex_index = pipeline.run(self.lattice(grid_size), azimuths, radius, angle)
+
+        start = time.time()
+        grid = cells.to_model()
+        square_ids, vertex_ids = self.db.bulk_insert_grid(grid, cells)
+        try:
+            sectors.vertex_ids = vertex_ids[sectors.vertex_ids]
+            sectors.ids = self.db.bulk_insert_sectors(sectors)
+            self.db.bulk_insert_intersections(sectors.ids[sector_index], vertex_ids[vertex_index])
+        except Exception:
+            self.db.delete_grid(grid.id)
+            raise
+        end = time.time()
+        logger.info(f"Sharded results persistence took {end - start:.2f} seconds")
+        return grid, sectors
+
+    @timed("generate_streaming")
+    def generate_streaming(self, grid_size: float, azimuths: List[int] = None, radius: int = 5, angle: int = 60,
+                           chunk_size: int = 50000, workers: int = 1) -> Grid:
+        cells = self.lattice(grid_size)
+        grid = cells.to_model()
+        grid_id = self.db.create_grid(grid)
+        if grid_id is None:
+            raise RuntimeError(f"Failed to create a grid of {len(cells)} squares")
+        pipeline = ShardedPipeline(self._COMBINED_AREA, workers, strip_columns=max(1, chunk_size // cells.rows))
+
+        halo = halo_columns(cells, radius)
+        vertex_ids: Dict[int, np.ndarray] = {}
+
+        def resolve(lattice_indices: np.ndarray) -> np.ndarray:
+            columns, rows = np.divmod(lattice_indices, cells.rows + 1)
+            resolved = np.empty(len(lattice_indices), dtype=np.int64)
+            for column in np.unique(columns).tolist():
+                mask = columns == column
+                resolved[mask] = vertex_ids[column][rows[mask]]
+            return resolved
+
+        pending_sectors, pending_vertices = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        start = time.time()
+        try:
+            for strip in pipeline.iter_strips(cells, azimuths, radius, angle):
+                first_column = strip.start + 1 if strip.start else 0
+                indices = cells.column_vertices(first_column, strip.stop + 1)
+                vertex_i, vertex_j = np.divmod(indices, cells.rows + 1)
+                inserted_ids = self.db.bulk_insert_vertices(
+                    grid_id, vertex_i, vertex_j, cells.vertex_coordinates_at(indices)
+                )
+                for column, ids in zip(range(first_column, strip.stop + 1), inserted_ids.reshape(-1, cells.rows + 1)):
+                    vertex_ids[column] = ids
+
+                square_i, square_j = cells.column_cells(strip.start, strip.stop)
+                self.db.bulk_insert_squares(grid_id, square_i, square_j, strip.is_matching,
+                                            resolve(cells.corner_indices_at(square_i, square_j).ravel()).reshape(-1, 4))
+
+                sectors = SectorSet(
+                    vertex_ids=resolve(strip.sector_vertices),
+                    azimuths=strip.sector_azimuths,
+                    radius=radius,
+                    angle=angle,
+                    polygons=shapely.from_wkb(strip.sector_polygons)
+                )
+                sector_ids = self.db.bulk_insert_sectors(sectors)
+
+                pending_sectors = np.concatenate([pending_sectors, sector_ids[strip.intersection_sectors]])
+                pending_vertices = np.concatenate([pending_vertices, strip.intersection_vertices])
+                ready = pending_vertices // (cells.rows + 1) <= strip.stop
+                self.db.bulk_insert_intersections(pending_sectors[ready], resolve(pending_vertices[ready]))
+                pending_sectors, pending_vertices = pending_sectors[~ready], pending_vertices[~ready]
+
+                for column in [column for column in vertex_ids if column < strip.stop - halo]:
+                    del vertex_ids[column]
+                logger.debug(f"Strip {strip.start}-{strip.stop} of grid {grid_id} persisted")
+        except Exception:
+            self.db.delete_grid(grid_id)
+            raise
+
+        end = time.time()
+        logger.info(f"Streaming generation of grid {grid_id} took {end - start:.2f} seconds")
+        return grid
@@ -0,0 +1,334 @@
+import json
+import time
+from enum import Enum
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+import shapely
+
+from internal.columnar import GridCells, SectorSet
+from internal.models import Grid
+from internal.storage import StorageBackend
+from pkg.logger import get_logger
+
+logger = get_logger(__name__)
+
+GEOPARQUET_VERSION = "1.1.0"
+
+
+class ArchiveFormat(Enum):
+    PARQUET = "parquet"
+    ARROW = "arrow"
+
+
+class ArchiveTable(Enum):
+    SQUARES = "squares"
+    VERTICES = "vertices"
+    SECTORS = "sectors"
+    INTERSECTIONS = "intersections"
+
+
+SCHEMAS = {
+    ArchiveTable.SQUARES: pa.schema([
+        ("i", pa.int32()), ("j", pa.int32()), ("is_matching", pa.bool_()), ("geometry", pa.binary())
+    ]),
+    ArchiveTable.VERTICES: pa.schema([
+        ("id", pa.int64()), ("i", pa.int32()), ("j", pa.int32()), ("geometry", pa.binary())
+    ]),
+    ArchiveTable.SECTORS: pa.schema([
+        ("id", pa.int64()), ("vertex_id", pa.int64()), ("azimuth", pa.int32()), ("radius", pa.int32()),
+        ("angle", pa.int32()), ("geometry", pa.binary())
+    ]),
+    ArchiveTable.INTERSECTIONS: pa.schema([("sector_id", pa.int64()), ("vertex_id", pa.int64())])
+}
+
+GEOMETRY_TYPES = {
+    ArchiveTable.SQUARES: ["Polygon"],
+    ArchiveTable.VERTICES: ["Point"],
+    ArchiveTable.SECTORS: ["Polygon"]
+}
+
+
+def _metadata(table: ArchiveTable, grid: Dict) -> Dict[bytes, bytes]:
+    metadata = {b"grid": json.dumps(grid).encode()}
+    if table in GEOMETRY_TYPES:
+        metadata[b"geo"] = json.dumps({
+            "version": GEOPARQUET_VERSION,
+            "primary_column": "geometry",
+            "columns": {"geometry": {"encoding": "WKB", "geometry_types": GEOMETRY_TYPES[table]}}
+        }).encode()
+    return metadata
+
+
+def _grid_metadata(cells: GridCells) -> Dict:
+    return {
+        "size": cells.size,
+        "origin_x": cells.origin_x,
+        "origin_y": cells.origin_y,
+        "step_x": cells.step_x,
+        "step_y": cells.step_y,
+        "columns": cells.columns,
+        "rows": cells.rows
+    }
+
+
+class _IdMap:
+    def __init__(self, old_ids: np.ndarray, new_ids: np.ndarray):
+        order = np.argsort(old_ids, kind="stable")
+        self._old_ids, self._new_ids = old_ids[order], new_ids[order]
+
+    def __call__(self, ids: np.ndarray) -> np.ndarray:
+        return self._new_ids[np.searchsorted(self._old_ids, ids)]
+
+
+class GridArchiveWriter:
+    def __init__(self, directory: Path, archive_format: ArchiveFormat = ArchiveFormat.PARQUET,
+                 row_group_size: int = 100000):
+        self.directory = Path(directory)
+        self.archive_format = archive_format
+        self.row_group_size = row_group_size
+        self._grid = None
+
+    def _path(self, table: ArchiveTable) -> Path:
+        return self.directory / f"{table.value}.{self.archive_format.value}"
+
+    def _write(self, table: ArchiveTable, batches: Iterator[Dict[str, np.ndarray]]) -> int:
+        schema = SCHEMAS[table].with_metadata(_metadata(table, self._grid))
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(table)
+        temporary = path.with_suffix(".tmp")
+        rows = 0
+        start = time.time()
+        if self.archive_format == ArchiveFormat.PARQUET:
+            writer = pq.ParquetWriter(temporary, schema, compression="zstd")
+        else:
+            writer = ipc.new_file(str(temporary), schema)
+        try:
+            for columns in batches:
+                batch = pa.RecordBatch.from_arrays(
+                    [pa.array(columns[field.name], type=field.type) for field in schema], schema=schema
+                )
+                if self.archive_format == ArchiveFormat.PARQUET:
+                    writer.write_batch(batch, row_group_size=self.row_group_size)
+                else:
+                    writer.write_batch(batch)
+                rows += batch.num_rows
+        finally:
+            writer.close()
+        temporary.replace(path)
+        end = time.time()
+        logger.info(f"Wrote {rows} {table.value} to {path} in {end - start:.2f} seconds")
+        return rows
+
+    def _slices(self, count: int) -> Iterator[slice]:
+        for start in range(0, count, self.row_group_size):
+            yield slice(start, min(start + self.row_group_size, count))
+
+    def write_grid(self, cells: GridCells, vertex_ids: np.ndarray = None):
+        self._grid = _grid_metadata(cells)
+        for table in ArchiveTable:
+            for archive_format in ArchiveFormat:
+                (self.directory / f"{table.value}.{archive_format.value}").unlink(missing_ok=True)
+        if vertex_ids is None:
+            vertex_ids = np.arange(cells.vertex_count, dtype=np.int64)
+        columns_per_group = max(1, self.row_group_size // cells.rows)
+
+        def squares() -> Iterator[Dict[str, np.ndarray]]:
+            for start in range(0, cells.columns, columns_per_group):
+                stop = min(start + columns_per_group, cells.columns)
+                i, j = cells.column_cells(start, stop)
+                yield {
+                    "i": i,
+                    "j": j,
+                    "is_matching": cells.is_matching[start * cells.rows:stop * cells.rows],
+                    "geometry": shapely.to_wkb(cells.column_boxes(start, stop))
+                }
+
+        def vertices() -> Iterator[Dict[str, np.ndarray]]:
+            for part in self._slices(cells.vertex_count):
+                indices = np.arange(part.start, part.stop)
+                i, j = np.divmod(indices, cells.rows + 1)
+                yield {
+                    "id": vertex_ids[part],
+                    "i": i,
+                    "j": j,
+                    "geometry": shapely.to_wkb(shapely.points(cells.vertex_coordinates_at(indices)))
+                }
+
+        self._write(ArchiveTable.SQUARES, squares())
+        self._write(ArchiveTable.VERTICES, vertices())
+
+    def write_sectors(self, sectors: SectorSet):
+        ids = sectors.ids if sectors.ids is not None else np.arange(len(sectors), dtype=np.int64)
+        self._write(ArchiveTable.SECTORS, ({
+            "id": ids[part],
+            "vertex_id": sectors.vertex_ids[part],
+            "azimuth": sectors.azimuths[part],
+            "radius": np.full(part.stop - part.start, sectors.radius, dtype=np.int32),
+            "angle": np.full(part.stop - part.start, sectors.angle, dtype=np.int32),
+            "geometry": shapely.to_wkb(sectors.polygons[part])
+        } for part in self._slices(len(sectors))))
+
+    def write_intersections(self, sector_ids: np.ndarray, vertex_ids: np.ndarray):
+        self._write(ArchiveTable.INTERSECTIONS, ({
+            "sector_id": sector_ids[part],
+            "vertex_id": vertex_ids[part]
+        } for part in self._slices(len(sector_ids))))
+
+
+class GridArchive:
+    def __init__(self, directory: Path, batch_size: int = 100000):
+        self.directory = Path(directory)
+        self.batch_size = batch_size
+        paths = {path.stem: path for path in self.directory.glob("*.*") if path.suffix in (".parquet", ".arrow")}
+        self._paths = {table: paths[table.value] for table in ArchiveTable if table.value in paths}
+        if ArchiveTable.SQUARES not in self._paths:
+            raise FileNotFoundError(f"No grid archive in {self.directory}")
+        self.grid = json.loads(self.schema(ArchiveTable.SQUARES).metadata[b"grid"])
+
+    def __contains__(self, table: ArchiveTable) -> bool:
+        return table in self._paths
+
+    def schema(self, table: ArchiveTable) -> pa.Schema:
+        path = self._paths[table]
+        if path.suffix == ".parquet":
+            return pq.read_schema(path, memory_map=True)
+        with pa.memory_map(str(path)) as source:
+            return ipc.open_file(source).schema
+
+    def iter_batches(self, table: ArchiveTable, columns: List[str] = None) -> Iterator[pa.RecordBatch]:
+        path = self._paths[table]
+        if path.suffix == ".parquet":
+            yield from pq.ParquetFile(path, memory_map=True).iter_batches(self.batch_size, columns=columns)
+            return
+        with pa.memory_map(str(path)) as source:
+            reader = ipc.open_file(source)
+            for index in range(reader.num_record_batches):
+                batch = reader.get_batch(index)
+                yield batch.select(columns) if columns else batch
+
+    def read(self, table: ArchiveTable, columns: List[str] = None) -> pa.Table:
+        schema = SCHEMAS[table]
+        if columns:
+            schema = pa.schema([schema.field(column) for column in columns])
+        return pa.Table.from_batches(list(self.iter_batches(table, columns)), schema=schema)
+
+    @property
+    def cells(self) -> GridCells:
+        cells = GridCells(is_matching=np.empty(0, dtype=bool), **self.grid)
+        is_matching = np.zeros(len(cells), dtype=bool)
+        for batch in self.iter_batches(ArchiveTable.SQUARES, ["i", "j", "is_matching"]):
+            i, j, matching = (column.to_numpy(zero_copy_only=False) for column in batch.columns)
+            is_matching[i.astype(np.int64) * cells.rows + j] = matching
+        cells.is_matching = is_matching
+        return cells
+
+    def vertex_arrays(self, matching_only: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        ids, coordinates = [np.empty(0, dtype=np.int64)], [np.empty((0, 2), dtype=np.float64)]
+        matching = None
+        if matching_only:
+            cells = self.cells
+            matching = np.zeros(cells.vertex_count, dtype=bool)
+            matching[cells.matching_vertices] = True
+        for batch in self.iter_batches(ArchiveTable.VERTICES, ["id", "i", "j", "geometry"]):
+            vertex_ids, i, j, geometry = (column.to_numpy(zero_copy_only=False) for column in batch.columns)
+            if matching is not None:
+                keep = matching[i.astype(np.int64) * (self.grid["rows"] + 1) + j]
+                vertex_ids, geometry = vertex_ids[keep], geometry[keep]
+            ids.append(vertex_ids)
+            coordinates.append(shapely.get_coordinates(shapely.from_wkb(geometry)))
+        ids, coordinates = np.concatenate(ids), np.concatenate(coordinates)
+        order = np.argsort(ids, kind="stable")
+        return ids[order], coordinates[order]
+
+    def sector_set(self) -> SectorSet | None:
+        if ArchiveTable.SECTORS not in self:
+            return None
+        table = self.read(ArchiveTable.SECTORS)
+        return SectorSet(
+            vertex_ids=table["vertex_id"].to_numpy(),
+            azimuths=table["azimuth"].to_numpy().astype(np.int64),
+            radius=table["radius"][0].as_py() if len(table) else 0,
+            angle=table["angle"][0].as_py() if len(table) else 0,
+            polygons=shapely.from_wkb(table["geometry"].to_numpy(zero_copy_only=False)),
+            ids=table["id"].to_numpy()
+        )
+
+    def intersections(self) -> Tuple[np.ndarray, np.ndarray]:
+        if ArchiveTable.INTERSECTIONS not in self:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        table = self.read(ArchiveTable.INTERSECTIONS)
+        return table["sector_id"].to_numpy(), table["vertex_id"].to_numpy()
+
+
+def export_grid(db: StorageBackend, grid_id: int, directory: Path, stage_id: int = None,
+                archive_format: ArchiveFormat = ArchiveFormat.PARQUET, row_group_size: int = 100000) -> Path | None:
+    cells = db.get_grid_cells(grid_id)
+    if cells is None:
+        logger.error(f"Grid {grid_id} not found")
+        return None
+    writer = GridArchiveWriter(directory, archive_format, row_group_size)
+    writer.write_grid(cells, db.get_lattice_vertex_ids(grid_id))
+    sectors = db.get_sector_set(grid_id, stage_id)
+    if sectors is not None and len(sectors):
+        writer.write_sectors(sectors)
+        writer.write_intersections(*db.get_intersection_arrays(grid_id, stage_id))
+    return writer.directory
+
+
+def import_grid(db: StorageBackend, archive: GridArchive, batch_size: int = 10000) -> Grid | None:
+    start = time.time()
+    cells = GridCells(is_matching=np.empty(0, dtype=bool), **archive.grid)
+    grid = cells.to_model()
+    grid_id = db.create_grid(grid)
+    if grid_id is None:
+        return None
+
+    lattice_ids = np.empty(cells.vertex_count, dtype=np.int64)
+    archive_ids = np.empty(cells.vertex_count, dtype=np.int64)
+    try:
+        for batch in archive.iter_batches(ArchiveTable.VERTICES):
+            ids, i, j, geometry = (column.to_numpy(zero_copy_only=False) for column in batch.columns)
+            indices = i.astype(np.int64) * (cells.rows + 1) + j
+            inserted = db.bulk_insert_vertices(grid_id, i, j, shapely.get_coordinates(shapely.from_wkb(geometry)),
+                                               batch_size)
+            lattice_ids[indices], archive_ids[indices] = inserted, ids
+
+        for batch in archive.iter_batches(ArchiveTable.SQUARES, ["i", "j", "is_matching"]):
+            i, j, matching = (column.to_numpy(zero_copy_only=False) for column in batch.columns)
+            i, j = i.astype(np.int64), j.astype(np.int64)
+            corner_ids = lattice_ids[cells.corner_indices_at(i, j).ravel()].reshape(-1, 4)
+            db.bulk_insert_squares(grid_id, i, j, matching, corner_ids, batch_size)
+
+        if ArchiveTable.SECTORS in archive:
+            vertex_map = _IdMap(archive_ids, lattice_ids)
+            archive_sector_ids, sector_ids = [], []
+            for batch in archive.iter_batches(ArchiveTable.SECTORS):
+                columns = {name: column.to_numpy(zero_copy_only=False)
+                           for name, column in zip(batch.schema.names, batch.columns)}
+                sectors = SectorSet(
+                    vertex_ids=vertex_map(columns["vertex_id"]),
+                    azimuths=columns["azimuth"],
+                    radius=int(columns["radius"][0]),
+                    angle=int(columns["angle"][0]),
+                    polygons=shapely.from_wkb(columns["geometry"])
+                )
+                archive_sector_ids.append(columns["id"])
+                sector_ids.append(db.bulk_insert_sectors(sectors, batch_size))
+
+            if archive_sector_ids and ArchiveTable.INTERSECTIONS in archive:
+                sector_map = _IdMap(np.concatenate(archive_sector_ids), np.concatenate(sector_ids))
+                for batch in archive.iter_batches(ArchiveTable.INTERSECTIONS):
+                    intersected_sectors, intersected_vertices = (column.to_numpy() for column in batch.columns)
+                    db.bulk_insert_intersections(sector_map(intersected_sectors), vertex_map(intersected_vertices))
+    except Exception:
+        db.delete_grid(grid_id)
+        raise
+
+    end = time.time()
+    logger.info(f"Imported grid {grid_id} from {archive.directory} in {end - start:.2f} seconds")
+    return grid
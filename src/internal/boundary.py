@@ -0,0 +1,137 @@
+import math
+import threading
+from functools import cached_property
+from pathlib import Path
+from typing import Dict, Tuple
+
+import geopandas as gpd
+import numpy as np
+import shapely
+from pyproj import Geod
+from shapely import Point
+from shapely.geometry.base import BaseGeometry
+
+from internal.features import FeatureStore
+from internal.models import BoundarySummary, Direction, ExtremePoint
+from pkg.cache import LRUCache, file_hash
+from pkg.logger import get_logger
+
+logger = get_logger(__name__)
+
+BOUNDARY_CACHE_DIR = Path(__file__).parent.parent.parent / "resources/output/boundaries"
+
+_GEOD = Geod(ellps="WGS84")
+
+
+def _read_repaired(path: Path) -> gpd.GeoDataFrame:
+    gdf = gpd.read_file(path)
+    gdf["geometry"] = gdf["geometry"].apply(lambda geom: geom.buffer(0) if not geom.is_valid else geom)
+    return gdf
+
+
+class Boundary:
+    def __init__(self, path: Path, digest: str, area: BaseGeometry, directory: Path):
+        self.path = path
+        self.digest = digest
+        self.area = area
+        self.directory = directory
+        self._variants: Dict[int, BaseGeometry] = {}
+        self._lock = threading.Lock()
+        shapely.prepare(self.area)
+
+    @cached_property
+    def gdf(self) -> gpd.GeoDataFrame:
+        return _read_repaired(self.path)
+
+    @cached_property
+    def features(self) -> FeatureStore:
+        return FeatureStore.from_gdf(self.gdf)
+
+    @cached_property
+    def bounds(self) -> Tuple[float, float, float, float]:
+        return tuple(float(value) for value in shapely.bounds(self.area))
+
+    @cached_property
+    def summary(self) -> BoundarySummary:
+        polygons = shapely.get_parts(self.area)
+        coordinates = shapely.get_coordinates(shapely.get_exterior_ring(polygons))
+        north, south = coordinates[np.argmax(coordinates[:, 1])], coordinates[np.argmin(coordinates[:, 1])]
+        west, east = coordinates[np.argmin(coordinates[:, 0])], coordinates[np.argmax(coordinates[:, 0])]
+        area, perimeter = _GEOD.geometry_area_perimeter(self.area)
+        return BoundarySummary(
+            extreme_points=(
+                ExtremePoint(Direction.NORTH, Point(north)),
+                ExtremePoint(Direction.SOUTH, Point(south)),
+                ExtremePoint(Direction.WEST, Point(west)),
+                ExtremePoint(Direction.EAST, Point(east))
+            ),
+            bounds=self.bounds,
+            centroid=shapely.centroid(self.area),
+            area=abs(area) / 1e6,
+            perimeter=perimeter / 1000,
+            feature_bounds=shapely.bounds(self.gdf.geometry.values)
+        )
+
+    @staticmethod
+    def level(tolerance: float) -> int:
+        return math.floor(math.log2(tolerance))
+
+    def simplified(self, tolerance: float) -> BaseGeometry:
+        level = self.level(tolerance)
+        with self._lock:
+            if level not in self._variants:
+                path = self.directory / f"{self.digest}.{level}.wkb"
+                if path.exists():
+                    variant = shapely.from_wkb(path.read_bytes())
+                else:
+                    variant = self.area.simplify(2.0 ** level, preserve_topology=True)
+                    _write_atomic(path, shapely.to_wkb(variant))
+                shapely.prepare(variant)
+                self._variants[level] = variant
+                logger.debug(f"Boundary {self.path.name} simplified at level {level}")
+            return self._variants[level]
+
+
+def _write_atomic(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_suffix(f".{threading.get_ident()}.tmp")
+    temporary.write_bytes(data)
+    temporary.replace(path)
+
+
+class BoundaryCache:
+    def __init__(self, directory: Path = BOUNDARY_CACHE_DIR, max_entries: int = 8):
+        self.directory = directory
+        self._entries = LRUCache(max_entries)
+        self._lock = threading.Lock()
+
+    def load(self, path: Path) -> Boundary:
+        path = Path(path).resolve()
+        key = (str(path), file_hash(path))
+        boundary = self._entries.get(key)
+        if boundary is not None:
+            return boundary
+
+        with self._lock:
+            boundary = self._entries.get(key)
+            if boundary is None:
+                boundary = self._load(path, key[1])
+                self._entries.put(key, boundary)
+            return boundary
+
+    def _load(self, path: Path, digest: str) -> Boundary:
+        wkb_path = self.directory / f"{digest}.wkb"
+        if wkb_path.exists():
+            boundary = Boundary(path, digest, shapely.from_wkb(wkb_path.read_bytes()), self.directory)
+            logger.debug(f"Boundary {path.name} loaded from disk cache")
+            return boundary
+
+        gdf = _read_repaired(path)
+        boundary = Boundary(path, digest, gdf.unary_union, self.directory)
+        boundary.gdf = gdf
+        _write_atomic(wkb_path, shapely.to_wkb(boundary.area))
+        logger.debug(f"Boundary {path.name} cached")
+        return boundary
+
+
+boundaries = BoundaryCache()
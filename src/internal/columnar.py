@@ -0,0 +1,162 @@
+from dataclasses import dataclass
+from typing import List, Tuple
+
+import numpy as np
+import shapely
+
+from internal.models import Grid, Sector
+
+
+@dataclass
+class GridCells:
+    size: float
+    origin_x: float
+    origin_y: float
+    step_x: float
+    step_y: float
+    columns: int
+    rows: int
+    is_matching: np.ndarray
+
+    def __len__(self) -> int:
+        return self.columns * self.rows
+
+    @classmethod
+    def from_model(cls, grid: Grid, is_matching: np.ndarray = None) -> "GridCells":
+        return cls(
+            size=grid.size,
+            origin_x=grid.origin_x,
+            origin_y=grid.origin_y,
+            step_x=grid.step_x,
+            step_y=grid.step_y,
+            columns=grid.columns,
+            rows=grid.rows,
+            is_matching=np.empty(0, dtype=bool) if is_matching is None else is_matching
+        )
+
+    def to_model(self) -> Grid:
+        return Grid(
+            size=self.size,
+            origin_x=self.origin_x,
+            origin_y=self.origin_y,
+            step_x=self.step_x,
+            step_y=self.step_y,
+            columns=self.columns,
+            rows=self.rows
+        )
+
+    @property
+    def xs(self) -> np.ndarray:
+        return self.origin_x + self.step_x * np.arange(self.columns + 1)
+
+    @property
+    def ys(self) -> np.ndarray:
+        return self.origin_y + self.step_y * np.arange(self.rows + 1)
+
+    def column_cells(self, start: int, stop: int) -> Tuple[np.ndarray, np.ndarray]:
+        return np.repeat(np.arange(start, stop), self.rows), np.tile(np.arange(self.rows), stop - start)
+
+    def column_vertices(self, start: int, stop: int) -> np.ndarray:
+        return np.arange(start * (self.rows + 1), stop * (self.rows + 1))
+
+    @property
+    def i(self) -> np.ndarray:
+        return self.column_cells(0, self.columns)[0]
+
+    @property
+    def j(self) -> np.ndarray:
+        return self.column_cells(0, self.columns)[1]
+
+    @property
+    def x(self) -> np.ndarray:
+        return np.repeat(self.xs[:-1], self.rows)
+
+    @property
+    def y(self) -> np.ndarray:
+        return np.tile(self.ys[:-1], self.columns)
+
+    @property
+    def boxes(self) -> np.ndarray:
+        return self.column_boxes(0, self.columns)
+
+    def column_boxes(self, start: int, stop: int) -> np.ndarray:
+        xs, ys = self.xs, self.ys
+        i, j = self.column_cells(start, stop)
+        return shapely.box(xs[i], ys[j], xs[i + 1], ys[j + 1])
+
+    @property
+    def vertex_count(self) -> int:
+        return (self.columns + 1) * (self.rows + 1)
+
+    @property
+    def vertex_i(self) -> np.ndarray:
+        return np.repeat(np.arange(self.columns + 1), self.rows + 1)
+
+    @property
+    def vertex_j(self) -> np.ndarray:
+        return np.tile(np.arange(self.rows + 1), self.columns + 1)
+
+    @property
+    def vertex_coordinates(self) -> np.ndarray:
+        return np.column_stack([np.repeat(self.xs, self.rows + 1), np.tile(self.ys, self.columns + 1)])
+
+    def vertex_coordinates_at(self, indices: np.ndarray) -> np.ndarray:
+        i, j = np.divmod(indices, self.rows + 1)
+        return np.column_stack([self.xs[i], self.ys[j]])
+
+    def corner_indices_at(self, i: np.ndarray, j: np.ndarray) -> np.ndarray:
+        a = i * (self.rows + 1) + j
+        return np.column_stack([a, a + self.rows + 1, a + self.rows + 2, a + 1])
+
+    @property
+    def corner_indices(self) -> np.ndarray:
+        return self.corner_indices_at(self.i, self.j)
+
+    @property
+    def corners(self) -> np.ndarray:
+        return self.vertex_coordinates[self.corner_indices]
+
+    @property
+    def matches(self) -> np.ndarray:
+        return np.flatnonzero(self.is_matching)
+
+    @property
+    def not_matches(self) -> np.ndarray:
+        return np.flatnonzero(~self.is_matching)
+
+    @property
+    def matching_vertices(self) -> np.ndarray:
+        return np.unique(self.corner_indices[self.is_matching])
+
+
+@dataclass
+class SectorSet:
+    vertex_ids: np.ndarray
+    azimuths: np.ndarray
+    radius: int
+    angle: int
+    polygons: np.ndarray
+    ids: np.ndarray = None
+    stage_id: int = None
+
+    def __len__(self) -> int:
+        return len(self.polygons)
+
+    @classmethod
+    def from_models(cls, sectors: List[Sector]) -> "SectorSet":
+        return cls(
+            vertex_ids=np.fromiter((sector.vertex_id for sector in sectors), dtype=np.int64, count=len(sectors)),
+            azimuths=np.fromiter((sector.azimuth for sector in sectors), dtype=np.int64, count=len(sectors)),
+            radius=sectors[0].radius if sectors else 0,
+            angle=sectors[0].angle if sectors else 0,
+            polygons=shapely.from_wkb([bytes(sector.polygon.data) for sector in sectors]),
+            ids=np.fromiter((sector.id for sector in sectors), dtype=np.int64, count=len(sectors)),
+            stage_id=sectors[0].stage_id if sectors else None
+        )
+
+    def to_models(self) -> List[Sector]:
+        return [
+            Sector(vertex_id=int(vertex_id), stage_id=self.stage_id, azimuth=int(azimuth), radius=self.radius,
+                   angle=self.angle, polygon=polygon)
+            for vertex_id, azimuth, polygon in zip(self.vertex_ids, self.azimuths, self.polygons)
+        ]
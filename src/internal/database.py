@@ -1,31 +1,253 @@
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Iterable, Iterator, List, Tuple
+
+import numpy as np
+import psycopg2
+import shapely
 from geoalchemy2.shape import from_shape
-from sqlalchemy import create_engine
+from sqlalchemy import and_, create_engine, inspect, text
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, aliased, scoped_session, selectinload, sessionmaker
+from sqlalchemy.orm.attributes import set_committed_value
 
-from internal.models import Base, Feature, Grid, Vertex, Square, Sector, SectorVertexIntersection
+from internal.columnar import GridCells, SectorSet
+from internal.models import Base, Feature, Grid, PipelineStage, Vertex, Square, Sector, SectorVertexIntersection
+from internal.storage import StorageBackend
+from pkg.config import settings
 from pkg.logger import get_logger
+from pkg.metrics import count_commit, count_rollback, instrument_engine, observe_copy
 
 logger = get_logger(__name__)
 
+TILE_LAYERS = {
+    "squares": """
+        SELECT s.id, s.is_matching, ST_AsMVTGeom(ST_Transform(ST_MakeEnvelope(
+            g.origin_x + s.i * g.step_x, g.origin_y + s.j * g.step_y,
+            g.origin_x + (s.i + 1) * g.step_x, g.origin_y + (s.j + 1) * g.step_y, 4326
+        ), 3857), bounds.tile) AS geom
+        FROM squares s JOIN grids g ON g.id = s.grid_id, bounds
+        WHERE s.grid_id = :grid_id
+          AND s.i BETWEEN floor((ST_XMin(bounds.area) - g.origin_x) / g.step_x) - 1
+                      AND ceil((ST_XMax(bounds.area) - g.origin_x) / g.step_x)
+          AND s.j BETWEEN floor((ST_YMin(bounds.area) - g.origin_y) / g.step_y) - 1
+                      AND ceil((ST_YMax(bounds.area) - g.origin_y) / g.step_y)
+    """,
+    "vertices": """
+        SELECT v.id, v.i, v.j, ST_AsMVTGeom(ST_Transform(v.point, 3857), bounds.tile) AS geom
+        FROM vertices v, bounds
+        WHERE v.grid_id = :grid_id AND v.point && bounds.area
+    """,
+    "sectors": """
+        SELECT s.id, s.azimuth, s.radius,
+               ST_AsMVTGeom(ST_Transform(ST_SimplifyPreserveTopology(s.polygon, :tolerance), 3857), bounds.tile) AS geom
+        FROM sectors s JOIN vertices v ON v.id = s.vertex_id, bounds
+        WHERE v.grid_id = :grid_id AND s.polygon && bounds.area
+          AND (CAST(:stage_id AS INTEGER) IS NULL OR s.stage_id = :stage_id)
+    """
+}
+
 
-class DatabaseConnector:
-    def __init__(self, connection_string: str):
-        self.engine = create_engine(connection_string)
-        self.Session = sessionmaker(bind=self.engine)
-        self.session = self.Session()
+class DatabaseConnector(StorageBackend):
+    SUPPORTS_TILES = True
+
+    def __init__(self, connection_string: str, pool_size: int = None, max_overflow: int = None):
+        self.engine = create_engine(
+            connection_string,
+            pool_size=settings.DB_POOL_SIZE if pool_size is None else pool_size,
+            max_overflow=settings.DB_MAX_OVERFLOW if max_overflow is None else max_overflow,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=True
+        )
+        instrument_engine(self.engine)
+        self.Session = scoped_session(sessionmaker(bind=self.engine))
         self._initialize_database()
 
+    @property
+    def session(self) -> Session:
+        return self.Session()
+
+    def remove_session(self):
+        self.Session.remove()
+
+    def close(self):
+        self.Session.remove()
+        self.engine.dispose()
+        logger.debug("Database connections closed")
+
     def _initialize_database(self):
         Base.metadata.create_all(self.engine)
         logger.debug("All tables created")
+        self._check_schema()
+
+    def _check_schema(self):
+        inspector = inspect(self.engine)
+        outdated = []
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"]: column for column in inspector.get_columns(table.name)}
+            missing = [name for name in table.columns.keys() if name not in existing]
+            obsolete = [name for name, column in existing.items()
+                        if name not in table.columns and not column["nullable"] and column["default"] is None]
+            if missing:
+                outdated.append(f"{table.name} lacks {', '.join(missing)}")
+            if obsolete:
+                outdated.append(f"{table.name} still requires {', '.join(obsolete)}")
+        if outdated:
+            raise RuntimeError(
+                f"Database schema is out of date: {'; '.join(outdated)}. Tables are created but never altered, "
+                f"drop the outdated tables and restart to recreate them"
+            )
 
     def drop_all_tables(self):
         Base.metadata.drop_all(self.engine)
         logger.debug("All tables dropped")
 
     def __del__(self):
-        self.session.close()
+        self.Session.remove()
+
+    @staticmethod
+    def _reserve_ids(cursor, table: str, count: int) -> np.ndarray:
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+            (table, count)
+        )
+        return np.fromiter((row[0] for row in cursor.fetchall()), dtype=np.int64, count=count)
+
+    @staticmethod
+    def _copy_rows(cursor, table: str, columns: List[str], rows: Iterable[Tuple]):
+        buffer = io.StringIO()
+        buffer.writelines("\t".join(map(str, row)) + "\n" for row in rows)
+        size = buffer.tell()
+        buffer.seek(0)
+        start = time.perf_counter()
+        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+        observe_copy(table, size, time.perf_counter() - start)
+
+    @staticmethod
+    def _to_ewkb(geometries: np.ndarray) -> np.ndarray:
+        return shapely.to_wkb(shapely.set_srid(geometries, 4326), hex=True, include_srid=True)
+
+    @contextmanager
+    def _raw_transaction(self, connection=None) -> Iterator:
+        if connection is not None:
+            yield connection
+            return
+        connection = self.engine.raw_connection()
+        try:
+            yield connection
+            connection.commit()
+            count_commit()
+        except Exception:
+            connection.rollback()
+            count_rollback()
+            raise
+        finally:
+            connection.close()
+
+    def bulk_insert_vertices(self, grid_id: int, vertex_i: np.ndarray, vertex_j: np.ndarray,
+                             coordinates: np.ndarray, batch_size: int = 10000, connection=None) -> np.ndarray:
+        vertex_ids = np.empty(len(vertex_i), dtype=np.int64)
+        try:
+            with self._raw_transaction(connection) as connection:
+                cursor = connection.cursor()
+                for start in range(0, len(vertex_i), batch_size):
+                    end = min(start + batch_size, len(vertex_i))
+                    vertex_ids[start:end] = self._reserve_ids(cursor, Vertex.__tablename__, end - start)
+                    points = self._to_ewkb(shapely.points(coordinates[start:end]))
+                    self._copy_rows(cursor, Vertex.__tablename__, ["id", "grid_id", "i", "j", "point"], (
+                        (vertex_id, grid_id, i, j, point)
+                        for vertex_id, i, j, point in zip(vertex_ids[start:end].tolist(), vertex_i[start:end].tolist(),
+                                                          vertex_j[start:end].tolist(), points.tolist())
+                    ))
+                    logger.debug(f"Vertices {start}-{end} of grid {grid_id} inserted")
+            return vertex_ids
+        except psycopg2.Error as e:
+            logger.error(f"Failed to bulk insert vertices of grid {grid_id}: {e}")
+            raise
+
+    def bulk_insert_squares(self, grid_id: int, square_i: np.ndarray, square_j: np.ndarray, is_matching: np.ndarray,
+                            corner_ids: np.ndarray, batch_size: int = 10000, connection=None) -> np.ndarray:
+        square_ids = np.empty(len(square_i), dtype=np.int64)
+        try:
+            with self._raw_transaction(connection) as connection:
+                cursor = connection.cursor()
+                for start in range(0, len(square_i), batch_size):
+                    end = min(start + batch_size, len(square_i))
+                    square_ids[start:end] = self._reserve_ids(cursor, Square.__tablename__, end - start)
+                    self._copy_rows(cursor, Square.__tablename__, [
+                        "id", "grid_id", "i", "j", "is_matching",
+                        "vertex_a_id", "vertex_b_id", "vertex_c_id", "vertex_d_id"
+                    ], (
+                        (square_id, grid_id, i, j, matching, *corners)
+                        for square_id, i, j, matching, corners in zip(
+                            square_ids[start:end].tolist(), square_i[start:end].tolist(), square_j[start:end].tolist(),
+                            is_matching[start:end].tolist(), corner_ids[start:end].tolist()
+                        )
+                    ))
+                    logger.debug(f"Squares {start}-{end} of grid {grid_id} inserted")
+            return square_ids
+        except psycopg2.Error as e:
+            logger.error(f"Failed to bulk insert squares of grid {grid_id}: {e}")
+            raise
+
+    def bulk_insert_sectors(self, sectors: SectorSet, batch_size: int = 10000, connection=None) -> np.ndarray:
+        sector_ids = np.empty(len(sectors), dtype=np.int64)
+        stage_id = r"\N" if sectors.stage_id is None else sectors.stage_id
+        try:
+            with self._raw_transaction(connection) as connection:
+                cursor = connection.cursor()
+                for start in range(0, len(sectors), batch_size):
+                    end = min(start + batch_size, len(sectors))
+                    sector_ids[start:end] = self._reserve_ids(cursor, Sector.__tablename__, end - start)
+                    polygons = self._to_ewkb(sectors.polygons[start:end])
+                    self._copy_rows(cursor, Sector.__tablename__, [
+                        "id", "vertex_id", "stage_id", "azimuth", "radius", "angle", "polygon"
+                    ], (
+                        (sector_id, vertex_id, stage_id, azimuth, sectors.radius, sectors.angle, polygon)
+                        for sector_id, vertex_id, azimuth, polygon in zip(
+                            sector_ids[start:end].tolist(), sectors.vertex_ids[start:end].tolist(),
+                            sectors.azimuths[start:end].tolist(), polygons.tolist()
+                        )
+                    ))
+                    logger.debug(f"Sectors {start}-{end} inserted")
+            return sector_ids
+        except psycopg2.Error as e:
+            logger.error(f"Failed to bulk insert sectors: {e}")
+            raise
+
+    def bulk_insert_grid(self, grid: Grid, cells: GridCells, batch_size: int = 10000,
+                         stage: PipelineStage = None) -> Tuple[np.ndarray, np.ndarray]:
+        try:
+            with self._raw_transaction() as connection:
+                cursor = connection.cursor()
+                cursor.execute(
+                    f"INSERT INTO {Grid.__tablename__} (size, origin_x, origin_y, step_x, step_y, columns, rows) "
+                    "VALUES (%s, %s, %s, %s, %s, %s, %s) RETURNING id",
+                    (grid.size, grid.origin_x, grid.origin_y, grid.step_x, grid.step_y, grid.columns, grid.rows)
+                )
+                grid_id = cursor.fetchone()[0]
+                if stage is not None:
+                    cursor.execute(f"UPDATE {PipelineStage.__tablename__} SET grid_id = %s WHERE id = %s",
+                                   (grid_id, stage.id))
+                vertex_ids = self.bulk_insert_vertices(
+                    grid_id, cells.vertex_i, cells.vertex_j, cells.vertex_coordinates, batch_size, connection
+                )
+                square_ids = self.bulk_insert_squares(
+                    grid_id, cells.i, cells.j, cells.is_matching, vertex_ids[cells.corner_indices], batch_size,
+                    connection
+                )
+        except psycopg2.Error as e:
+            logger.error(f"Failed to bulk insert a grid of {len(cells)} squares: {e}")
+            raise
+        grid.id = grid_id
+        if stage is not None:
+            set_committed_value(stage, "grid_id", grid_id)
+        logger.debug(f"Grid {grid_id} with {len(cells)} squares and {cells.vertex_count} vertices inserted")
+        return square_ids, vertex_ids
 
     def create_feature(self, model: Feature) -> int:
         try:
@@ -140,6 +362,26 @@ class DatabaseConnector:
             self.session.rollback()
             logger.error(f"Failed to delete vertices: {e}")
 
+    def delete_grid(self, grid_id: int):
+        try:
+            vertex_ids = self.session.query(Vertex.id).filter(Vertex.grid_id == grid_id).scalar_subquery()
+            sector_ids = self.session.query(Sector.id).filter(Sector.vertex_id.in_(vertex_ids)).scalar_subquery()
+            self.session.query(SectorVertexIntersection).filter(
+                SectorVertexIntersection.sector_id.in_(sector_ids) | SectorVertexIntersection.vertex_id.in_(vertex_ids)
+            ).delete(synchronize_session=False)
+            self.session.query(Sector).filter(Sector.vertex_id.in_(vertex_ids)).delete(synchronize_session=False)
+            self.session.query(Square).filter(Square.grid_id == grid_id).delete(synchronize_session=False)
+            self.session.query(Vertex).filter(Vertex.grid_id == grid_id).delete(synchronize_session=False)
+            self.session.query(PipelineStage).filter(PipelineStage.grid_id == grid_id).update(
+                {PipelineStage.grid_id: None}, synchronize_session=False
+            )
+            self.session.query(Grid).filter(Grid.id == grid_id).delete(synchronize_session=False)
+            self.session.commit()
+            logger.debug(f"Grid {grid_id} deleted")
+        except SQLAlchemyError as e:
+            self.session.rollback()
+            logger.error(f"Failed to delete grid {grid_id}: {e}")
+
     def get_all_grids(self):
         try:
             return self.session.query(Grid).all()
@@ -150,12 +392,89 @@ class DatabaseConnector:
 
     def get_square_by_vertex_id(self, vertex_id: int):
         try:
-            return self.session.query(Square).filter(Square.vertices.any(id=vertex_id)).first()
+            vertex = aliased(Vertex)
+            return self.session.query(Square).join(vertex, and_(
+                Square.grid_id == vertex.grid_id,
+                Square.i.between(vertex.i - 1, vertex.i),
+                Square.j.between(vertex.j - 1, vertex.j)
+            )).filter(vertex.id == vertex_id).order_by(Square.i.desc(), Square.j.desc()).first()
 
         except SQLAlchemyError as e:
             logger.error(f"Failed to fetch square by vertex id: {e}")
             return None
 
+    def get_grid(self, grid_id: int) -> Grid | None:
+        try:
+            return self.session.query(Grid).options(
+                selectinload(Grid.squares),
+                selectinload(Grid.vertices)
+            ).filter_by(id=grid_id).first()
+
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to fetch grid {grid_id}: {e}")
+            return None
+
+    def iter_squares(self, grid_id: int, matching_only: bool = False,
+                     batch_size: int = 10000) -> Iterator[List[Square]]:
+        query = self.session.query(Square).options(
+            selectinload(Square.vertex_a),
+            selectinload(Square.vertex_b),
+            selectinload(Square.vertex_c),
+            selectinload(Square.vertex_d)
+        ).filter(Square.grid_id == grid_id)
+        if matching_only:
+            query = query.filter(Square.is_matching)
+
+        last_id = 0
+        while True:
+            try:
+                squares = query.filter(Square.id > last_id).order_by(Square.id).limit(batch_size).all()
+            except SQLAlchemyError as e:
+                logger.error(f"Failed to fetch squares of grid {grid_id} after {last_id}: {e}")
+                return
+            if not squares:
+                return
+            yield squares
+            last_id = squares[-1].id
+
+    def get_grid_cells(self, grid_id: int) -> GridCells | None:
+        try:
+            grid = self.session.get(Grid, grid_id)
+            if grid is None:
+                return None
+            rows = self.session.execute(
+                text("SELECT is_matching FROM squares WHERE grid_id = :grid_id ORDER BY i, j"), {"grid_id": grid_id}
+            ).scalars().all()
+            return GridCells.from_model(grid, np.fromiter(rows, dtype=bool, count=len(rows)))
+
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to fetch grid cells of grid {grid_id}: {e}")
+            return None
+
+    def get_sector_set(self, grid_id: int, stage_id: int = None) -> SectorSet | None:
+        query = """
+            SELECT s.id, s.vertex_id, s.azimuth, s.radius, s.angle, ST_AsBinary(s.polygon)
+            FROM sectors s JOIN vertices v ON v.id = s.vertex_id
+            WHERE v.grid_id = :grid_id AND (CAST(:stage_id AS INTEGER) IS NULL OR s.stage_id = :stage_id)
+            ORDER BY s.id
+        """
+        try:
+            rows = self.session.execute(text(query), {"grid_id": grid_id, "stage_id": stage_id}).all()
+            ids, vertex_ids, azimuths, radii, angles, polygons = zip(*rows) if rows else ([],) * 6
+            return SectorSet(
+                vertex_ids=np.array(vertex_ids, dtype=np.int64),
+                azimuths=np.array(azimuths, dtype=np.int64),
+                radius=radii[0] if rows else 0,
+                angle=angles[0] if rows else 0,
+                polygons=shapely.from_wkb([bytes(polygon) for polygon in polygons]),
+                ids=np.array(ids, dtype=np.int64),
+                stage_id=stage_id
+            )
+
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to fetch sectors of grid {grid_id}: {e}")
+            return None
+
     def get_grid_by_square_id(self, square_id: int):
         try:
             return self.session.query(Grid).filter_by(id=square_id).first()
@@ -164,6 +483,238 @@ class DatabaseConnector:
             logger.error(f"Failed to fetch grid by square id: {e}")
             return None
 
+    def get_vertex_arrays(self, grid_id: int, matching_only: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        if matching_only:
+            corners = " UNION ".join(
+                f"SELECT vertex_{corner}_id AS id FROM squares WHERE grid_id = :grid_id AND is_matching"
+                for corner in "abcd"
+            )
+            query = (f"SELECT v.id, ST_X(v.point), ST_Y(v.point) FROM vertices v "
+                     f"JOIN ({corners}) m ON m.id = v.id ORDER BY v.id")
+        else:
+            query = "SELECT id, ST_X(point), ST_Y(point) FROM vertices WHERE grid_id = :grid_id ORDER BY id"
+        try:
+            rows = self.session.execute(text(query), {"grid_id": grid_id}).all()
+            ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+            coordinates = np.array([(row[1], row[2]) for row in rows], dtype=np.float64).reshape(-1, 2)
+            return ids, coordinates
+
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to fetch vertex arrays of grid {grid_id}: {e}")
+            return np.empty(0, dtype=np.int64), np.empty((0, 2), dtype=np.float64)
+
+    def get_lattice_vertex_ids(self, grid_id: int) -> np.ndarray:
+        try:
+            rows = self.session.execute(
+                text("SELECT id FROM vertices WHERE grid_id = :grid_id ORDER BY i, j"), {"grid_id": grid_id}
+            ).scalars().all()
+            return np.fromiter(rows, dtype=np.int64, count=len(rows))
+
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to fetch vertex ids of grid {grid_id}: {e}")
+            return np.empty(0, dtype=np.int64)
+
+    def get_intersection_arrays(self, grid_id: int, stage_id: int = None) -> Tuple[np.ndarray, np.ndarray]:
+        query = """
+            SELECT i.sector_id, i.vertex_id
+            FROM sector_vertex_intersections i JOIN vertices v ON v.id = i.vertex_id
+            JOIN sectors s ON s.id = i.sector_id
+            WHERE v.grid_id = :grid_id AND (CAST(:stage_id AS INTEGER) IS NULL OR s.stage_id = :stage_id)
+            ORDER BY i.sector_id, i.vertex_id
+        """
+        try:
+            rows = self.session.execute(text(query), {"grid_id": grid_id, "stage_id": stage_id}).all()
+            pairs = np.array(rows, dtype=np.int64).reshape(-1, 2)
+            return pairs[:, 0], pairs[:, 1]
+
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to fetch intersections of grid {grid_id}: {e}")
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    def bulk_insert_intersections(self, sector_ids: np.ndarray, vertex_ids: np.ndarray, batch_size: int = 100000,
+                                  connection=None):
+        try:
+            with self._raw_transaction(connection) as connection:
+                cursor = connection.cursor()
+                for start in range(0, len(sector_ids), batch_size):
+                    end = min(start + batch_size, len(sector_ids))
+                    self._copy_rows(cursor, SectorVertexIntersection.__tablename__, ["sector_id", "vertex_id"],
+                                    zip(sector_ids[start:end].tolist(), vertex_ids[start:end].tolist()))
+            logger.debug(f"{len(sector_ids)} sector-vertex intersections inserted")
+        except psycopg2.Error as e:
+            logger.error(f"Failed to bulk insert sector-vertex intersections: {e}")
+            raise
+
+    def _ensure_intersection_indexes(self):
+        with self.engine.begin() as connection:
+            connection.execute(text(
+                "CREATE INDEX IF NOT EXISTS idx_sectors_polygon ON sectors USING GIST (polygon)"
+            ))
+            connection.execute(text(
+                "CREATE INDEX IF NOT EXISTS idx_vertices_point ON vertices USING GIST (point)"
+            ))
+            connection.execute(text(
+                "CREATE INDEX IF NOT EXISTS idx_sectors_vertex_id ON sectors (vertex_id)"
+            ))
+
+    def _insert_intersections_chunk(self, first_sector_id: int, last_sector_id: int, grid_id: int = None) -> int:
+        query = '''
+            INSERT INTO sector_vertex_intersections (sector_id, vertex_id)
+            SELECT s.id, v.id
+            FROM sectors s
+            JOIN vertices sv ON sv.id = s.vertex_id
+            JOIN vertices v ON v.grid_id = sv.grid_id AND ST_Contains(s.polygon, v.point)
+            WHERE s.id BETWEEN :first_sector_id AND :last_sector_id
+              AND (CAST(:grid_id AS INTEGER) IS NULL OR sv.grid_id = :grid_id)
+              AND EXISTS (
+                  SELECT 1 FROM squares q
+                  WHERE q.grid_id = v.grid_id AND q.is_matching
+                    AND q.i BETWEEN v.i - 1 AND v.i AND q.j BETWEEN v.j - 1 AND v.j
+              )
+            ON CONFLICT DO NOTHING
+        '''
+        with self.engine.begin() as connection:
+            result = connection.execute(text(query), {
+                "first_sector_id": first_sector_id,
+                "last_sector_id": last_sector_id,
+                "grid_id": grid_id
+            })
+            return result.rowcount
+
+    def compute_intersections(self, grid_id: int = None, chunk_size: int = 50000, workers: int = 1) -> int:
+        try:
+            self._ensure_intersection_indexes()
+            with self.engine.connect() as connection:
+                first_sector_id, last_sector_id = connection.execute(text(
+                    "SELECT min(s.id), max(s.id) FROM sectors s JOIN vertices v ON v.id = s.vertex_id "
+                    "WHERE CAST(:grid_id AS INTEGER) IS NULL OR v.grid_id = :grid_id"
+                ), {"grid_id": grid_id}).one()
+            if first_sector_id is None:
+                return 0
+
+            chunks = [
+                (start, min(start + chunk_size - 1, last_sector_id))
+                for start in range(first_sector_id, last_sector_id + 1, chunk_size)
+            ]
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                inserted = sum(executor.map(lambda chunk: self._insert_intersections_chunk(*chunk, grid_id), chunks))
+            logger.debug(f"{inserted} sector-vertex intersections computed in {len(chunks)} chunks")
+            return inserted
+
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to compute sector-vertex intersections: {e}")
+            return 0
+
+    def get_tile(self, layer: str, grid_id: int, z: int, x: int, y: int, stage_id: int = None) -> bytes:
+        query = f"""
+            WITH bounds AS (
+                SELECT ST_TileEnvelope(:z, :x, :y) AS tile, ST_Transform(ST_TileEnvelope(:z, :x, :y), 4326) AS area
+            ),
+            features AS ({TILE_LAYERS[layer]})
+            SELECT ST_AsMVT(features.*, :layer, 4096, 'geom') FROM features WHERE geom IS NOT NULL
+        """
+        try:
+            tile = self.session.execute(text(query), {
+                "layer": layer,
+                "grid_id": grid_id,
+                "stage_id": stage_id,
+                "z": z,
+                "x": x,
+                "y": y,
+                "tolerance": 360 / (256 * 2 ** z)
+            }).scalar()
+            return bytes(tile) if tile else b""
+
+        except SQLAlchemyError as e:
+            self.session.rollback()
+            logger.error(f"Failed to build {layer} tile {z}/{x}/{y} of grid {grid_id}: {e}")
+            return b""
+
+    def get_stage(self, key: str) -> PipelineStage | None:
+        try:
+            return self.session.query(PipelineStage).filter_by(key=key).populate_existing().first()
+
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to fetch pipeline stage {key}: {e}")
+            return None
+
+    @contextmanager
+    def stage_lock(self, key: str) -> Iterator[None]:
+        with self.engine.connect() as connection:
+            connection.execute(text("SELECT pg_advisory_lock(hashtext(:key))"), {"key": key})
+            connection.commit()
+            try:
+                yield
+            finally:
+                connection.execute(text("SELECT pg_advisory_unlock(hashtext(:key))"), {"key": key})
+                connection.commit()
+
+    def create_stage(self, model: PipelineStage) -> int:
+        try:
+            stage_id = self.session.execute(
+                insert(PipelineStage).values(
+                    stage=model.stage, key=model.key, parent_id=model.parent_id, grid_id=model.grid_id
+                ).on_conflict_do_nothing(index_elements=[PipelineStage.key]).returning(PipelineStage.id)
+            ).scalar()
+            self.session.commit()
+        except SQLAlchemyError as e:
+            self.session.rollback()
+            logger.error(f"Failed to create pipeline stage {model.key}: {e}")
+            raise
+        if stage_id is None:
+            raise RuntimeError(f"Pipeline stage {model.key} already exists")
+        model.id = stage_id
+        logger.debug(f"Pipeline stage {model.stage} {model.key} created")
+        return stage_id
+
+    def assign_stage_grid(self, model: PipelineStage, grid_id: int):
+        try:
+            model.grid_id = grid_id
+            self.session.commit()
+            logger.debug(f"Pipeline stage {model.key} assigned to grid {grid_id}")
+        except SQLAlchemyError as e:
+            self.session.rollback()
+            logger.error(f"Failed to assign pipeline stage {model.key} to grid {grid_id}: {e}")
+            raise
+
+    def complete_stage(self, model: PipelineStage, count: int, grid_id: int = None):
+        try:
+            model.count = count
+            if grid_id is not None:
+                model.grid_id = grid_id
+            model.complete = True
+            self.session.commit()
+            logger.debug(f"Pipeline stage {model.stage} {model.key} completed")
+        except SQLAlchemyError as e:
+            self.session.rollback()
+            logger.error(f"Failed to complete pipeline stage {model.key}: {e}")
+
+    def delete_stage_intersections(self, stage_id: int):
+        if stage_id is None:
+            raise ValueError("A pipeline stage id is required to delete stage intersections")
+        try:
+            sector_ids = self.session.query(Sector.id).filter(Sector.stage_id == stage_id)
+            self.session.query(SectorVertexIntersection).filter(
+                SectorVertexIntersection.sector_id.in_(sector_ids.scalar_subquery())
+            ).delete(synchronize_session=False)
+            self.session.commit()
+            logger.debug(f"Intersections of pipeline stage {stage_id} deleted")
+        except SQLAlchemyError as e:
+            self.session.rollback()
+            logger.error(f"Failed to delete intersections of pipeline stage {stage_id}: {e}")
+
+    def delete_stage_sectors(self, stage_id: int):
+        if stage_id is None:
+            raise ValueError("A pipeline stage id is required to delete stage sectors")
+        self.delete_stage_intersections(stage_id)
+        try:
+            self.session.query(Sector).filter(Sector.stage_id == stage_id).delete(synchronize_session=False)
+            self.session.commit()
+            logger.debug(f"Sectors of pipeline stage {stage_id} deleted")
+        except SQLAlchemyError as e:
+            self.session.rollback()
+            logger.error(f"Failed to delete sectors of pipeline stage {stage_id}: {e}")
+
     def create_sector_vertex_intersection(self, model: SectorVertexIntersection):
         try:
             self.session.add(model)
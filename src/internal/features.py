@@ -0,0 +1,71 @@
+import time
+from typing import Dict, List
+
+import geopandas as gpd
+import numpy as np
+import shapely
+from shapely import STRtree
+
+from internal.models import Feature
+from pkg.logger import get_logger
+from pkg.metrics import timed
+
+logger = get_logger(__name__)
+
+
+def _name_column(gdf: gpd.GeoDataFrame) -> str | None:
+    for column in gdf.columns:
+        if "name" in column.lower():
+            return column
+    return None
+
+
+class FeatureStore:
+    def __init__(self, names: np.ndarray, geometries: np.ndarray):
+        self.names = np.asarray(names, dtype=object)
+        self.geometries = np.asarray(geometries, dtype=object)
+        self.bounds = shapely.bounds(self.geometries)
+        self._tree = STRtree(self.geometries)
+        by_name: Dict[str, List[int]] = {}
+        for index, name in enumerate(self.names):
+            by_name.setdefault(name, []).append(index)
+        self._by_name = {name: np.array(indices, dtype=np.int64) for name, indices in by_name.items()}
+        shapely.prepare(self.geometries)
+
+    @classmethod
+    def from_gdf(cls, gdf: gpd.GeoDataFrame) -> "FeatureStore":
+        column = _name_column(gdf)
+        names = gdf[column].to_numpy(dtype=object) if column else np.full(len(gdf), None, dtype=object)
+        return cls(names, gdf.geometry.values)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def find(self, name: str) -> np.ndarray:
+        return self._by_name.get(name, np.empty(0, dtype=np.int64))
+
+    def features(self) -> List[Feature]:
+        return [Feature(name=name, multi_polygon=geometry) for name, geometry in zip(self.names, self.geometries)]
+
+    @timed("locate_features")
+    def locate(self, coordinates: np.ndarray) -> np.ndarray:
+        start = time.time()
+        points = shapely.points(coordinates)
+        point_index, feature_index = self._tree.query(points)
+        inside = shapely.contains(self.geometries[feature_index], points[point_index])
+        point_index, feature_index = point_index[inside], feature_index[inside]
+        regions = np.full(len(coordinates), -1, dtype=np.int64)
+        order = np.lexsort((feature_index, point_index))
+        point_index, feature_index = point_index[order], feature_index[order]
+        first = np.r_[True, point_index[1:] != point_index[:-1]]
+        regions[point_index[first]] = feature_index[first]
+        end = time.time()
+        logger.info(f"Located {len(coordinates)} points in {len(self)} features in {end - start:.2f} seconds")
+        return regions
+
+    def tag(self, coordinates: np.ndarray) -> np.ndarray:
+        regions = self.locate(coordinates)
+        names = np.full(len(regions), None, dtype=object)
+        inside = regions >= 0
+        names[inside] = self.names[regions[inside]]
+        return names
@@ -0,0 +1,170 @@
+import math
+import time
+from typing import Iterator, List, Tuple
+
+import numpy as np
+import shapely
+from shapely import STRtree
+
+from internal.columnar import GridCells, SectorSet
+from internal.models import Sector
+from internal.sectors import SectorBuilder, find_points_on_sphere
+from pkg.config import EARTH_RADIUS
+from pkg.logger import get_logger
+from pkg.metrics import timed
+
+logger = get_logger(__name__)
+
+
+class IntersectionEngine:
+    def __init__(self, vertex_ids: np.ndarray, vertex_coordinates: np.ndarray):
+        self.vertex_ids = np.asarray(vertex_ids)
+        self._tree = STRtree(shapely.points(vertex_coordinates))
+
+    @timed("intersect")
+    def intersect(self, sector_ids: np.ndarray, sector_polygons: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        start = time.time()
+        sector_index, vertex_index = self._tree.query(sector_polygons, predicate="contains")
+        end = time.time()
+        logger.info(f"Intersection of {len(sector_polygons)} sectors with {len(self.vertex_ids)} vertices "
+                    f"found {len(sector_index)} pairs in {end - start:.2f} seconds")
+        return np.asarray(sector_ids)[sector_index], self.vertex_ids[vertex_index]
+
+    def intersect_sectors(self, sectors: List[Sector]) -> Tuple[np.ndarray, np.ndarray]:
+        sector_set = SectorSet.from_models(sectors)
+        return self.intersect(sector_set.ids, sector_set.polygons)
+
+
+class LatticeIntersectionEngine:
+    def __init__(self, cells: GridCells, vertex_ids: np.ndarray, vertex_coordinates: np.ndarray,
+                 tolerance: float = 0.002, max_candidates: int = 4_000_000):
+        self.cells = cells
+        self.vertex_ids = np.asarray(vertex_ids)
+        self.vertex_coordinates = np.asarray(vertex_coordinates, dtype=np.float64).reshape(-1, 2)
+        self.tolerance = tolerance
+        self.max_candidates = max_candidates
+        self.fallbacks = 0
+
+        i = np.rint((self.vertex_coordinates[:, 0] - cells.origin_x) / cells.step_x).astype(np.int64)
+        j = np.rint((self.vertex_coordinates[:, 1] - cells.origin_y) / cells.step_y).astype(np.int64)
+        self._positions = np.full((cells.columns + 1, cells.rows + 1), -1, dtype=np.int64)
+        self._positions[i, j] = np.arange(len(self.vertex_ids))
+        self._radians = np.radians(self.vertex_coordinates)
+        self._cos_lat = np.cos(self._radians[:, 1])
+        self._sin_lat = np.sin(self._radians[:, 1])
+
+    def margin(self, radius: float, resolution: float, max_lat: float) -> float:
+        arc_sag = radius * (1 - math.cos(math.radians(resolution / 2)))
+        edge_sag = radius ** 2 * math.tan(math.radians(min(max_lat + math.degrees(radius / EARTH_RADIUS), 89))) / (
+            4 * EARTH_RADIUS
+        )
+        return self.tolerance + arc_sag + edge_sag
+
+    def _windows(self, centers: np.ndarray, azimuths: np.ndarray, radius: float, angle: float,
+                 margin: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        cardinals = np.array([0, 90, 180, 270], dtype=np.float64)
+        offsets = (cardinals[None, :] - azimuths[:, None] + 180) % 360 - 180
+        bearings = np.concatenate([
+            azimuths[:, None] + [-angle / 2, angle / 2],
+            np.where(np.abs(offsets) <= angle / 2, cardinals[None, :], azimuths[:, None] + angle / 2)
+        ], axis=1)
+        lon, lat = find_points_on_sphere(centers[:, 0, None], centers[:, 1, None], bearings, radius + margin)
+        lon = np.column_stack([lon, centers[:, 0]])
+        lat = np.column_stack([lat, centers[:, 1]])
+        pad_lat = math.degrees(margin / EARTH_RADIUS)
+        pad_lon = pad_lat / np.cos(np.radians(np.abs(lat).max(axis=1)))
+
+        cells = self.cells
+        min_x, max_x = lon.min(axis=1) - pad_lon, lon.max(axis=1) + pad_lon
+        min_y, max_y = lat.min(axis=1) - pad_lat, lat.max(axis=1) + pad_lat
+        i0 = np.clip(np.floor((min_x - cells.origin_x) / cells.step_x), 0, cells.columns).astype(np.int64)
+        i1 = np.clip(np.ceil((max_x - cells.origin_x) / cells.step_x), 0, cells.columns).astype(np.int64)
+        j0 = np.clip(np.floor((min_y - cells.origin_y) / cells.step_y), 0, cells.rows).astype(np.int64)
+        j1 = np.clip(np.ceil((max_y - cells.origin_y) / cells.step_y), 0, cells.rows).astype(np.int64)
+        return i0, i1, j0, j1
+
+    def _candidates(self, centers: np.ndarray, azimuths: np.ndarray, radius: float, angle: float,
+                    margin: float) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        i0, i1, j0, j1 = self._windows(centers, azimuths, radius, angle, margin)
+        width, height = int((i1 - i0).max(initial=0)) + 1, int((j1 - j0).max(initial=0)) + 1
+        di, dj = np.divmod(np.arange(width * height), height)
+        chunk_size = max(1, self.max_candidates // (width * height))
+
+        for start in range(0, len(centers), chunk_size):
+            end = min(start + chunk_size, len(centers))
+            ci = i0[start:end, None] + di[None, :]
+            cj = j0[start:end, None] + dj[None, :]
+            inside = (ci <= i1[start:end, None]) & (cj <= j1[start:end, None])
+            positions = np.full(inside.shape, -1, dtype=np.int64)
+            positions[inside] = self._positions[ci[inside], cj[inside]]
+            sector_index, slot = np.nonzero(positions >= 0)
+            yield sector_index + start, positions[sector_index, slot]
+
+    @timed("intersect_lattice")
+    def intersect(self, sector_ids: np.ndarray, centers: np.ndarray, azimuths: np.ndarray, radius: float,
+                  angle: float, polygons: np.ndarray = None, resolution: float = 1) -> Tuple[np.ndarray, np.ndarray]:
+        start = time.time()
+        centers = np.asarray(centers, dtype=np.float64).reshape(-1, 2)
+        azimuths = np.asarray(azimuths, dtype=np.float64)
+        margin = self.margin(radius, resolution, float(np.abs(centers[:, 1]).max(initial=0)))
+        sector_pairs, vertex_pairs = [], []
+        self.fallbacks = 0
+
+        center_radians = np.radians(centers)
+        center_cos_lat, center_sin_lat = np.cos(center_radians[:, 1]), np.sin(center_radians[:, 1])
+
+        for sector_index, vertex_index in self._candidates(centers, azimuths, radius, angle, margin):
+            delta_lon = self._radians[vertex_index, 0] - center_radians[sector_index, 0]
+            delta_lat = self._radians[vertex_index, 1] - center_radians[sector_index, 1]
+            cos_lat1, cos_lat2 = center_cos_lat[sector_index], self._cos_lat[vertex_index]
+            haversine = np.sin(delta_lat / 2) ** 2 + cos_lat1 * cos_lat2 * np.sin(delta_lon / 2) ** 2
+            distance = 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.clip(haversine, 0, 1)))
+
+            near = (distance > 0) & (distance < radius + margin)
+            sector_index, vertex_index, distance = sector_index[near], vertex_index[near], distance[near]
+            delta_lon, cos_lat1, cos_lat2 = delta_lon[near], cos_lat1[near], cos_lat2[near]
+            bearing = np.degrees(np.arctan2(
+                np.sin(delta_lon) * cos_lat2,
+                cos_lat1 * self._sin_lat[vertex_index] - center_sin_lat[sector_index] * cos_lat2 * np.cos(delta_lon)
+            ))
+
+            offset = np.abs((bearing - azimuths[sector_index] + 180) % 360 - 180) - angle / 2
+            edge_distance = np.where(np.abs(offset) < 90, distance * np.abs(np.sin(np.radians(offset))), np.inf)
+            contained = (distance < radius) & (offset < 0)
+            ambiguous = (np.abs(distance - radius) < margin) | (distance < margin) | (edge_distance < margin)
+            if ambiguous.any():
+                points = self.vertex_coordinates[vertex_index[ambiguous]]
+                contained[ambiguous] = self._contains_exact(
+                    sector_index[ambiguous], points, centers, azimuths, radius, angle, polygons, resolution
+                )
+                self.fallbacks += int(ambiguous.sum())
+
+            sector_pairs.append(sector_index[contained])
+            vertex_pairs.append(vertex_index[contained])
+
+        sector_index = np.concatenate(sector_pairs) if sector_pairs else np.empty(0, dtype=np.int64)
+        vertex_index = np.concatenate(vertex_pairs) if vertex_pairs else np.empty(0, dtype=np.int64)
+        end = time.time()
+        logger.info(f"Lattice intersection of {len(centers)} sectors with {len(self.vertex_ids)} vertices "
+                    f"found {len(sector_index)} pairs in {end - start:.2f} seconds "
+                    f"({self.fallbacks} boundary candidates tested against polygons)")
+        return np.asarray(sector_ids)[sector_index], self.vertex_ids[vertex_index]
+
+    @staticmethod
+    def _contains_exact(sector_index: np.ndarray, points: np.ndarray, centers: np.ndarray, azimuths: np.ndarray,
+                        radius: float, angle: float, polygons: np.ndarray, resolution: float) -> np.ndarray:
+        if polygons is None:
+            unique, inverse = np.unique(sector_index, return_inverse=True)
+            polygons = np.empty(len(unique), dtype=object)
+            builder = SectorBuilder(radius, angle, resolution)
+            for azimuth in np.unique(azimuths[unique]).tolist():
+                group = azimuths[unique] == azimuth
+                polygons[group] = builder.build(centers[unique[group]], [azimuth])
+            return shapely.contains_xy(polygons[inverse], points[:, 0], points[:, 1])
+        return shapely.contains_xy(polygons[sector_index], points[:, 0], points[:, 1])
+
+    def intersect_sector_set(self, sectors: SectorSet, resolution: float = 1) -> Tuple[np.ndarray, np.ndarray]:
+        order = np.argsort(self.vertex_ids)
+        positions = order[np.searchsorted(self.vertex_ids, sectors.vertex_ids, sorter=order)]
+        return self.intersect(sectors.ids, self.vertex_coordinates[positions], sectors.azimuths, sectors.radius,
+                              sectors.angle, sectors.polygons, resolution)
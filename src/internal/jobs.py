@@ -0,0 +1,136 @@
+import multiprocessing
+import threading
+import time
+import uuid
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from enum import Enum
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from pkg.logger import get_logger
+from pkg.metrics import registry
+
+logger = get_logger(__name__)
+
+
+class JobStatus(Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class _ProgressReporter:
+    def __init__(self, states, job_id: str):
+        self._states = states
+        self._job_id = job_id
+
+    def update(self, **fields):
+        state = dict(self._states[self._job_id])
+        state.update(fields)
+        self._states[self._job_id] = state
+
+    def __call__(self, stage: str, count: int):
+        self.update(**{stage: count})
+
+
+def _run_job(states, job_id: str, fn: Callable, args: tuple) -> Tuple[Any, tuple]:
+    registry.reset()
+    reporter = _ProgressReporter(states, job_id)
+    reporter.update(status=JobStatus.RUNNING.value)
+    return fn(reporter, *args), registry.snapshot()
+
+
+class JobManager:
+    def __init__(self, workers: int = 2, state_ttl: float = 3600):
+        self.workers = workers
+        self.state_ttl = state_ttl
+        self._manager = None
+        self._states = None
+        self._executor = None
+        self._futures: Dict[str, Future] = {}
+        self._active: Dict[Hashable, str] = {}
+        self._finished: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _start(self):
+        if self._executor is None:
+            self._manager = multiprocessing.Manager()
+            self._states = self._manager.dict()
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            logger.debug(f"Job pool with {self.workers} workers started")
+
+    def _expire(self):
+        deadline = time.monotonic() - self.state_ttl
+        for job_id in [job_id for job_id, finished in self._finished.items() if finished < deadline]:
+            del self._finished[job_id]
+            self._states.pop(job_id, None)
+            logger.debug(f"Job {job_id} expired")
+
+    def submit(self, key: Hashable, fn: Callable, *args, callback: Callable[[Any], None] = None) -> str:
+        with self._lock:
+            self._start()
+            self._expire()
+            job_id = self._active.get(key)
+            if job_id:
+                logger.debug(f"Job {job_id} reused for {key}")
+                return job_id
+
+            job_id = uuid.uuid4().hex
+            self._states[job_id] = {"id": job_id, "status": JobStatus.PENDING.value}
+            future = self._executor.submit(_run_job, self._states, job_id, fn, args)
+            self._futures[job_id] = future
+            self._active[key] = job_id
+
+        future.add_done_callback(lambda done: self._finish(key, job_id, done, callback))
+        logger.info(f"Job {job_id} submitted")
+        return job_id
+
+    def _finish(self, key: Hashable, job_id: str, future: Future, callback: Callable[[Any], None] = None):
+        if self._states is None:
+            logger.debug(f"Job {job_id} ended after shutdown")
+            return
+        try:
+            result, metrics = future.result()
+            registry.merge(*metrics)
+            if callback:
+                result = callback(result)
+            update = {"status": JobStatus.DONE.value, "result": result}
+            logger.info(f"Job {job_id} finished")
+        except CancelledError:
+            update = {"status": JobStatus.CANCELLED.value}
+            logger.warning(f"Job {job_id} cancelled")
+        except Exception as e:
+            update = {"status": JobStatus.FAILED.value, "error": str(e)}
+            logger.error(f"Job {job_id} failed: {e}")
+
+        with self._lock:
+            if self._states is None:
+                logger.debug(f"Job {job_id} ended after shutdown")
+                return
+            state = dict(self._states.get(job_id, {"id": job_id}))
+            state.update(update)
+            self._states[job_id] = state
+            self._active.pop(key, None)
+            self._futures.pop(job_id, None)
+            self._finished[job_id] = time.monotonic()
+
+    def status(self, job_id: str) -> Dict[str, Any] | None:
+        with self._lock:
+            if self._states is None:
+                return None
+            self._expire()
+            state = self._states.get(job_id)
+        return dict(state) if state is not None else None
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is None:
+                return
+            executor, manager = self._executor, self._manager
+            self._manager, self._states, self._executor = None, None, None
+            self._futures.clear()
+            self._active.clear()
+            self._finished.clear()
+        executor.shutdown(wait=False, cancel_futures=True)
+        manager.shutdown()
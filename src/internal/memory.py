@@ -0,0 +1,427 @@
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+import shapely
+from geoalchemy2.shape import from_shape
+
+from internal.columnar import GridCells, SectorSet
+from internal.intersection import IntersectionEngine
+from internal.models import Feature, Grid, PipelineStage, Sector, SectorVertexIntersection, Square, Vertex
+from internal.storage import StorageBackend
+from pkg.logger import get_logger
+
+logger = get_logger(__name__)
+
+NO_STAGE = -1
+
+
+class _Table:
+    def __init__(self, **dtypes):
+        self._dtypes = dtypes
+        self._lock = threading.RLock()
+        self.clear()
+
+    def __len__(self) -> int:
+        return len(next(iter(self.columns.values())))
+
+    def clear(self):
+        with self._lock:
+            self._chunks: List[Dict[str, np.ndarray]] = []
+            self._columns = {name: np.empty((0, *shape), dtype=dtype) for name, (dtype, shape) in self._dtypes.items()}
+
+    def append(self, **columns):
+        chunk = {name: np.asarray(columns[name], dtype=self._dtypes[name][0]) for name in self._dtypes}
+        with self._lock:
+            self._chunks.append(chunk)
+
+    @property
+    def columns(self) -> Dict[str, np.ndarray]:
+        with self._lock:
+            if self._chunks:
+                self._columns = {
+                    name: np.concatenate([self._columns[name]] + [chunk[name] for chunk in self._chunks])
+                    for name in self._dtypes
+                }
+                self._chunks = []
+            return self._columns
+
+    def keep(self, mask: np.ndarray):
+        with self._lock:
+            self._columns = {name: column[mask] for name, column in self.columns.items()}
+
+    def positions(self, ids: np.ndarray) -> np.ndarray:
+        table_ids = self.columns["id"]
+        ids = np.asarray(ids, dtype=np.int64)
+        positions = np.searchsorted(table_ids, ids)
+        found = positions < len(table_ids)
+        found[found] = table_ids[positions[found]] == ids[found]
+        return np.where(found, positions, -1)
+
+
+def _lattice_key(grid_id: np.ndarray, i: np.ndarray, j: np.ndarray) -> np.ndarray:
+    return (np.asarray(grid_id, dtype=np.int64) << 42) | (np.asarray(i, dtype=np.int64) << 21) | np.asarray(j)
+
+
+class MemoryStorage(StorageBackend):
+    def __init__(self):
+        self._sequences: Dict[str, int] = defaultdict(lambda: 1)
+        self._grids: Dict[int, Grid] = {}
+        self._stages: Dict[str, PipelineStage] = {}
+        self._stage_locks: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+        self._sequence_lock = threading.Lock()
+        self._features: List[Feature] = []
+        self._vertices = _Table(id=(np.int64, ()), grid_id=(np.int64, ()), i=(np.int64, ()), j=(np.int64, ()),
+                                coordinates=(np.float64, (2,)))
+        self._squares = _Table(id=(np.int64, ()), grid_id=(np.int64, ()), i=(np.int64, ()), j=(np.int64, ()),
+                               is_matching=(bool, ()), corner_ids=(np.int64, (4,)))
+        self._sectors = _Table(id=(np.int64, ()), vertex_id=(np.int64, ()), stage_id=(np.int64, ()),
+                               azimuth=(np.int64, ()), radius=(np.int64, ()), angle=(np.int64, ()),
+                               polygon=(object, ()))
+        self._intersections = _Table(sector_id=(np.int64, ()), vertex_id=(np.int64, ()))
+        self._square_index = None
+
+    def _reserve_ids(self, table: str, count: int) -> np.ndarray:
+        with self._sequence_lock:
+            start = self._sequences[table]
+            self._sequences[table] = start + count
+        return np.arange(start, start + count, dtype=np.int64)
+
+    def _reserve_id(self, table: str) -> int:
+        return int(self._reserve_ids(table, 1)[0])
+
+    def create_grid(self, model: Grid) -> int:
+        model.id = self._reserve_id(Grid.__tablename__)
+        self._grids[model.id] = model
+        logger.debug("Grid created")
+        return model.id
+
+    def create_square(self, model: Square) -> int:
+        model.id = self._reserve_id(Square.__tablename__)
+        corner_ids = [getattr(model, f"vertex_{corner}_id") or getattr(model, f"vertex_{corner}").id
+                      for corner in "abcd"]
+        self._squares.append(id=[model.id], grid_id=[model.grid_id or model.grid.id], i=[model.i], j=[model.j],
+                             is_matching=[True if model.is_matching is None else model.is_matching],
+                             corner_ids=[corner_ids])
+        self._square_index = None
+        logger.debug("Square created")
+        return model.id
+
+    def create_vertex(self, model: Vertex) -> int:
+        model.id = self._reserve_id(Vertex.__tablename__)
+        self._vertices.append(id=[model.id], grid_id=[model.grid_id or model.grid.id], i=[model.i], j=[model.j],
+                              coordinates=[(model.point.x, model.point.y)])
+        model.point = from_shape(model.point, srid=4326)
+        logger.debug("Vertex created")
+        return model.id
+
+    def create_sector(self, model: Sector) -> int:
+        model.id = self._reserve_id(Sector.__tablename__)
+        self._sectors.append(id=[model.id], vertex_id=[model.vertex_id],
+                             stage_id=[NO_STAGE if model.stage_id is None else model.stage_id],
+                             azimuth=[model.azimuth], radius=[model.radius], angle=[model.angle],
+                             polygon=[model.polygon])
+        model.polygon = from_shape(model.polygon, srid=4326)
+        logger.debug("Sector created")
+        return model.id
+
+    def create_sector_vertex_intersection(self, model: SectorVertexIntersection):
+        self._intersections.append(sector_id=[model.sector_id], vertex_id=[model.vertex_id])
+        logger.debug("Sector-vertex intersection created")
+
+    def create_feature(self, model: Feature) -> int:
+        model.id = self._reserve_id(Feature.__tablename__)
+        self._features.append(model)
+        logger.debug(f"Feature '{model.name}' created")
+        return model.id
+
+    def bulk_insert_vertices(self, grid_id: int, vertex_i: np.ndarray, vertex_j: np.ndarray,
+                             coordinates: np.ndarray, batch_size: int = 10000) -> np.ndarray:
+        vertex_ids = self._reserve_ids(Vertex.__tablename__, len(vertex_i))
+        self._vertices.append(id=vertex_ids, grid_id=np.full(len(vertex_ids), grid_id), i=vertex_i, j=vertex_j,
+                              coordinates=np.asarray(coordinates, dtype=np.float64).reshape(-1, 2))
+        logger.debug(f"Vertices of grid {grid_id} inserted")
+        return vertex_ids
+
+    def bulk_insert_squares(self, grid_id: int, square_i: np.ndarray, square_j: np.ndarray, is_matching: np.ndarray,
+                            corner_ids: np.ndarray, batch_size: int = 10000) -> np.ndarray:
+        square_ids = self._reserve_ids(Square.__tablename__, len(square_i))
+        self._squares.append(id=square_ids, grid_id=np.full(len(square_ids), grid_id), i=square_i, j=square_j,
+                             is_matching=is_matching, corner_ids=np.asarray(corner_ids).reshape(-1, 4))
+        self._square_index = None
+        logger.debug(f"Squares of grid {grid_id} inserted")
+        return square_ids
+
+    def bulk_insert_sectors(self, sectors: SectorSet, batch_size: int = 10000) -> np.ndarray:
+        sector_ids = self._reserve_ids(Sector.__tablename__, len(sectors))
+        self._sectors.append(
+            id=sector_ids,
+            vertex_id=sectors.vertex_ids,
+            stage_id=np.full(len(sectors), NO_STAGE if sectors.stage_id is None else sectors.stage_id),
+            azimuth=sectors.azimuths,
+            radius=np.full(len(sectors), sectors.radius),
+            angle=np.full(len(sectors), sectors.angle),
+            polygon=sectors.polygons
+        )
+        logger.debug(f"{len(sector_ids)} sectors inserted")
+        return sector_ids
+
+    def bulk_insert_intersections(self, sector_ids: np.ndarray, vertex_ids: np.ndarray, batch_size: int = 100000):
+        self._intersections.append(sector_id=sector_ids, vertex_id=vertex_ids)
+        logger.debug(f"{len(sector_ids)} sector-vertex intersections inserted")
+
+    def _vertex_models(self, positions: np.ndarray) -> List[Vertex]:
+        columns = self._vertices.columns
+        return [
+            Vertex(id=vertex_id, grid_id=grid_id, i=i, j=j, point=from_shape(shapely.Point(x, y), srid=4326))
+            for vertex_id, grid_id, i, j, (x, y) in zip(
+                columns["id"][positions].tolist(), columns["grid_id"][positions].tolist(),
+                columns["i"][positions].tolist(), columns["j"][positions].tolist(),
+                columns["coordinates"][positions].tolist()
+            )
+        ]
+
+    def _square_models(self, positions: np.ndarray) -> List[Square]:
+        columns = self._squares.columns
+        corner_ids = columns["corner_ids"][positions]
+        vertex_positions = self._vertices.positions(corner_ids.ravel())
+        found = vertex_positions >= 0
+        vertices = dict(zip(corner_ids.ravel()[found].tolist(), self._vertex_models(vertex_positions[found])))
+        return [
+            Square(id=square_id, grid_id=grid_id, i=i, j=j, is_matching=is_matching,
+                   vertex_a_id=a, vertex_b_id=b, vertex_c_id=c, vertex_d_id=d, vertex_a=vertices.get(a),
+                   vertex_b=vertices.get(b), vertex_c=vertices.get(c), vertex_d=vertices.get(d))
+            for square_id, grid_id, i, j, is_matching, (a, b, c, d) in zip(
+                columns["id"][positions].tolist(), columns["grid_id"][positions].tolist(),
+                columns["i"][positions].tolist(), columns["j"][positions].tolist(),
+                columns["is_matching"][positions].tolist(), corner_ids.tolist()
+            )
+        ]
+
+    def _sector_models(self, positions: np.ndarray) -> List[Sector]:
+        columns = self._sectors.columns
+        return [
+            Sector(id=sector_id, vertex_id=vertex_id, stage_id=None if stage_id == NO_STAGE else stage_id,
+                   azimuth=azimuth, radius=radius, angle=angle, polygon=from_shape(polygon, srid=4326))
+            for sector_id, vertex_id, stage_id, azimuth, radius, angle, polygon in zip(
+                columns["id"][positions].tolist(), columns["vertex_id"][positions].tolist(),
+                columns["stage_id"][positions].tolist(), columns["azimuth"][positions].tolist(),
+                columns["radius"][positions].tolist(), columns["angle"][positions].tolist(),
+                columns["polygon"][positions]
+            )
+        ]
+
+    def get_all_features(self) -> List[Feature]:
+        return list(self._features)
+
+    def get_all_grids(self) -> List[Grid]:
+        return list(self._grids.values())
+
+    def get_all_squares(self) -> List[Square]:
+        return self._square_models(np.arange(len(self._squares)))
+
+    def get_all_sectors(self) -> List[Sector]:
+        return self._sector_models(np.arange(len(self._sectors)))
+
+    def _square_lookup(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self._square_index is None:
+            columns = self._squares.columns
+            keys = _lattice_key(columns["grid_id"], columns["i"], columns["j"])
+            order = np.argsort(keys, kind="stable")
+            self._square_index = keys[order], order
+        return self._square_index
+
+    def _find_squares(self, grid_id: np.ndarray, i: np.ndarray, j: np.ndarray) -> np.ndarray:
+        keys, order = self._square_lookup()
+        query = _lattice_key(grid_id, i, j)
+        positions = np.searchsorted(keys, query)
+        found = positions < len(keys)
+        found[found] = keys[positions[found]] == query[found]
+        squares = np.full(len(query), -1, dtype=np.int64)
+        squares[found] = order[positions[found]]
+        return squares
+
+    def get_square_by_vertex_id(self, vertex_id: int) -> Square | None:
+        position = self._vertices.positions([vertex_id])[0]
+        if position < 0:
+            return None
+        columns = self._vertices.columns
+        grid_id, i, j = columns["grid_id"][position], columns["i"][position], columns["j"][position]
+        candidates = self._find_squares(np.full(4, grid_id), np.array([i, i, i - 1, i - 1]),
+                                        np.array([j, j - 1, j, j - 1]))
+        candidates = candidates[candidates >= 0]
+        return self._square_models(candidates[:1])[0] if len(candidates) else None
+
+    def _grid_rows(self, table: _Table, grid_id: int) -> np.ndarray:
+        return np.flatnonzero(table.columns["grid_id"] == grid_id)
+
+    def get_grid(self, grid_id: int) -> Grid | None:
+        stored = self._grids.get(grid_id)
+        if stored is None:
+            return None
+        grid = GridCells.from_model(stored).to_model()
+        grid.id = grid_id
+        grid.squares = self._square_models(self._grid_rows(self._squares, grid_id))
+        grid.vertices = self._vertex_models(self._grid_rows(self._vertices, grid_id))
+        return grid
+
+    def iter_squares(self, grid_id: int, matching_only: bool = False,
+                     batch_size: int = 10000) -> Iterator[List[Square]]:
+        positions = self._grid_rows(self._squares, grid_id)
+        if matching_only:
+            positions = positions[self._squares.columns["is_matching"][positions]]
+        for start in range(0, len(positions), batch_size):
+            yield self._square_models(positions[start:start + batch_size])
+
+    def get_grid_cells(self, grid_id: int) -> GridCells | None:
+        grid = self._grids.get(grid_id)
+        if grid is None:
+            return None
+        columns = self._squares.columns
+        positions = self._grid_rows(self._squares, grid_id)
+        positions = positions[np.lexsort((columns["j"][positions], columns["i"][positions]))]
+        return GridCells.from_model(grid, columns["is_matching"][positions])
+
+    def _grid_sectors(self, grid_id: int, stage_id: int = None) -> np.ndarray:
+        columns = self._sectors.columns
+        vertex_positions = self._vertices.positions(columns["vertex_id"])
+        in_grid = vertex_positions >= 0
+        in_grid[in_grid] = self._vertices.columns["grid_id"][vertex_positions[in_grid]] == grid_id
+        if stage_id is not None:
+            in_grid &= columns["stage_id"] == stage_id
+        return np.flatnonzero(in_grid)
+
+    def get_sector_set(self, grid_id: int, stage_id: int = None) -> SectorSet | None:
+        columns = self._sectors.columns
+        positions = self._grid_sectors(grid_id, stage_id)
+        return SectorSet(
+            vertex_ids=columns["vertex_id"][positions],
+            azimuths=columns["azimuth"][positions],
+            radius=int(columns["radius"][positions[0]]) if len(positions) else 0,
+            angle=int(columns["angle"][positions[0]]) if len(positions) else 0,
+            polygons=columns["polygon"][positions],
+            ids=columns["id"][positions],
+            stage_id=stage_id
+        )
+
+    def _matching_vertex_ids(self, grid_id: int) -> np.ndarray:
+        columns = self._squares.columns
+        positions = self._grid_rows(self._squares, grid_id)
+        return np.unique(columns["corner_ids"][positions[columns["is_matching"][positions]]])
+
+    def get_vertex_arrays(self, grid_id: int, matching_only: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        columns = self._vertices.columns
+        if matching_only:
+            positions = self._vertices.positions(self._matching_vertex_ids(grid_id))
+            positions = positions[positions >= 0]
+        else:
+            positions = self._grid_rows(self._vertices, grid_id)
+        return columns["id"][positions], columns["coordinates"][positions]
+
+    def get_lattice_vertex_ids(self, grid_id: int) -> np.ndarray:
+        columns = self._vertices.columns
+        positions = self._grid_rows(self._vertices, grid_id)
+        return columns["id"][positions[np.lexsort((columns["j"][positions], columns["i"][positions]))]]
+
+    def get_intersection_arrays(self, grid_id: int, stage_id: int = None) -> Tuple[np.ndarray, np.ndarray]:
+        columns = self._intersections.columns
+        keep = np.isin(columns["sector_id"], self._sectors.columns["id"][self._grid_sectors(grid_id, stage_id)])
+        order = np.lexsort((columns["vertex_id"][keep], columns["sector_id"][keep]))
+        return columns["sector_id"][keep][order], columns["vertex_id"][keep][order]
+
+    def compute_intersections(self, grid_id: int = None, chunk_size: int = 50000, workers: int = 1) -> int:
+        inserted = 0
+        for current_grid_id in ([grid_id] if grid_id is not None else list(self._grids)):
+            sectors = self.get_sector_set(current_grid_id)
+            engine = IntersectionEngine(*self.get_vertex_arrays(current_grid_id))
+            existing = set(zip(*(array.tolist() for array in self.get_intersection_arrays(current_grid_id))))
+            for start in range(0, len(sectors), chunk_size):
+                sector_ids, vertex_ids = engine.intersect(sectors.ids[start:start + chunk_size],
+                                                          sectors.polygons[start:start + chunk_size])
+                new = np.fromiter((pair not in existing for pair in zip(sector_ids.tolist(), vertex_ids.tolist())),
+                                  dtype=bool, count=len(sector_ids))
+                self.bulk_insert_intersections(sector_ids[new], vertex_ids[new])
+                inserted += int(new.sum())
+        logger.debug(f"{inserted} sector-vertex intersections computed")
+        return inserted
+
+    def delete_all_features(self):
+        self._features = []
+        logger.debug("All features deleted")
+
+    def delete_all_squares(self):
+        self._squares.clear()
+        self._square_index = None
+        logger.debug("All squares deleted")
+
+    def delete_all_sectors(self):
+        self._sectors.clear()
+        logger.debug("All sectors deleted")
+
+    def delete_all_vertices(self):
+        self._vertices.clear()
+        logger.debug("All vertices deleted")
+
+    def delete_grid(self, grid_id: int):
+        vertex_ids = self._vertices.columns["id"][self._grid_rows(self._vertices, grid_id)]
+        sector_ids = self._sectors.columns["id"][np.isin(self._sectors.columns["vertex_id"], vertex_ids)]
+        intersections = self._intersections.columns
+        self._intersections.keep(~(np.isin(intersections["sector_id"], sector_ids)
+                                   | np.isin(intersections["vertex_id"], vertex_ids)))
+        self._sectors.keep(~np.isin(self._sectors.columns["id"], sector_ids))
+        self._squares.keep(self._squares.columns["grid_id"] != grid_id)
+        self._vertices.keep(self._vertices.columns["grid_id"] != grid_id)
+        self._square_index = None
+        for stage in self._stages.values():
+            if stage.grid_id == grid_id:
+                stage.grid_id = None
+        self._grids.pop(grid_id, None)
+        logger.debug(f"Grid {grid_id} deleted")
+
+    def get_stage(self, key: str) -> PipelineStage | None:
+        return self._stages.get(key)
+
+    @contextmanager
+    def stage_lock(self, key: str) -> Iterator[None]:
+        with self._stage_locks[key]:
+            yield
+
+    def create_stage(self, model: PipelineStage) -> int:
+        if model.key in self._stages:
+            raise RuntimeError(f"Pipeline stage {model.key} already exists")
+        model.id = self._reserve_id(PipelineStage.__tablename__)
+        if model.count is None:
+            model.count = 0
+        if model.complete is None:
+            model.complete = False
+        self._stages[model.key] = model
+        logger.debug(f"Pipeline stage {model.stage} {model.key} created")
+        return model.id
+
+    def assign_stage_grid(self, model: PipelineStage, grid_id: int):
+        model.grid_id = grid_id
+        logger.debug(f"Pipeline stage {model.key} assigned to grid {grid_id}")
+
+    def complete_stage(self, model: PipelineStage, count: int, grid_id: int = None):
+        model.count = count
+        if grid_id is not None:
+            model.grid_id = grid_id
+        model.complete = True
+        logger.debug(f"Pipeline stage {model.stage} {model.key} completed")
+
+    def delete_stage_intersections(self, stage_id: int):
+        if stage_id is None:
+            raise ValueError("A pipeline stage id is required to delete stage intersections")
+        columns = self._sectors.columns
+        stage_sectors = columns["id"][columns["stage_id"] == stage_id]
+        self._intersections.keep(~np.isin(self._intersections.columns["sector_id"], stage_sectors))
+        logger.debug(f"Intersections of pipeline stage {stage_id} deleted")
+
+    def delete_stage_sectors(self, stage_id: int):
+        if stage_id is None:
+            raise ValueError("A pipeline stage id is required to delete stage sectors")
+        self.delete_stage_intersections(stage_id)
+        self._sectors.keep(self._sectors.columns["stage_id"] != stage_id)
+        logger.debug(f"Sectors of pipeline stage {stage_id} deleted")
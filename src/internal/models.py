@@ -2,10 +2,11 @@ from dataclasses import dataclass
 from enum import Enum
 from typing import List, Tuple
 
+import numpy as np
 from geoalchemy2 import Geometry
 from geoalchemy2.shape import to_shape
 from shapely import Point, Polygon, MultiPolygon
-from sqlalchemy import String, Integer, Column, ForeignKey, Float, Boolean
+from sqlalchemy import String, Integer, Column, ForeignKey, Float, Boolean, UniqueConstraint
 from sqlalchemy.orm import declarative_base, relationship
 
 Base = declarative_base()
@@ -24,6 +25,19 @@ class ExtremePoint:
     point: Point
 
 
+@dataclass
+class BoundarySummary:
+    extreme_points: Tuple[ExtremePoint, ExtremePoint, ExtremePoint, ExtremePoint]
+    bounds: Tuple[float, float, float, float]
+    centroid: Point
+    area: float
+    perimeter: float
+    feature_bounds: np.ndarray
+
+    def extreme_point(self, direction: Direction) -> ExtremePoint:
+        return next(point for point in self.extreme_points if point.direction == direction)
+
+
 class Feature(Base):
     __tablename__ = "features"
 
@@ -44,8 +58,15 @@ class Grid(Base):
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     size = Column(Float, nullable=False)
+    origin_x = Column(Float, nullable=False)
+    origin_y = Column(Float, nullable=False)
+    step_x = Column(Float, nullable=False)
+    step_y = Column(Float, nullable=False)
+    columns = Column(Integer, nullable=False)
+    rows = Column(Integer, nullable=False)
 
     squares = relationship("Square", back_populates="grid")
+    vertices = relationship("Vertex", back_populates="grid")
 
     @property
     def matches(self) -> List["Square"]:
@@ -61,13 +82,27 @@ class Grid(Base):
 
 class Square(Base):
     __tablename__ = "squares"
+    __table_args__ = (UniqueConstraint("grid_id", "i", "j"),)
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     grid_id = Column(Integer, ForeignKey("grids.id"), nullable=False)
+    i = Column(Integer, nullable=False)
+    j = Column(Integer, nullable=False)
     is_matching = Column(Boolean, nullable=False, default=True)
+    vertex_a_id = Column(Integer, ForeignKey("vertices.id"), nullable=False)
+    vertex_b_id = Column(Integer, ForeignKey("vertices.id"), nullable=False)
+    vertex_c_id = Column(Integer, ForeignKey("vertices.id"), nullable=False)
+    vertex_d_id = Column(Integer, ForeignKey("vertices.id"), nullable=False)
 
     grid = relationship("Grid", back_populates="squares")
-    vertices = relationship("Vertex", back_populates="square")
+    vertex_a = relationship("Vertex", foreign_keys=[vertex_a_id])
+    vertex_b = relationship("Vertex", foreign_keys=[vertex_b_id])
+    vertex_c = relationship("Vertex", foreign_keys=[vertex_c_id])
+    vertex_d = relationship("Vertex", foreign_keys=[vertex_d_id])
+
+    @property
+    def vertices(self) -> List["Vertex"]:
+        return [self.vertex_a, self.vertex_b, self.vertex_c, self.vertex_d]
 
     @property
     def shapely_polygon(self) -> Polygon:
@@ -93,12 +128,15 @@ class Square(Base):
 
 class Vertex(Base):
     __tablename__ = "vertices"
+    __table_args__ = (UniqueConstraint("grid_id", "i", "j"),)
 
     id = Column(Integer, primary_key=True, autoincrement=True)
+    grid_id = Column(Integer, ForeignKey("grids.id"), nullable=False)
+    i = Column(Integer, nullable=False)
+    j = Column(Integer, nullable=False)
     point = Column(Geometry("Point", srid=4326), nullable=False)
-    square_id = Column(Integer, ForeignKey("squares.id"), nullable=False)
 
-    square = relationship("Square", back_populates="vertices")
+    grid = relationship("Grid", back_populates="vertices")
     sectors = relationship("Sector", back_populates="vertex")
     sector_intersections = relationship("SectorVertexIntersection", back_populates="vertex")
 
@@ -107,7 +145,26 @@ class Vertex(Base):
         return to_shape(self.point)
 
     def __repr__(self):
-        return f"Vertex<id={self.id}, square_id={self.square_id}>"
+        return f"Vertex<id={self.id}, grid_id={self.grid_id}, i={self.i}, j={self.j}>"
+
+
+class PipelineStage(Base):
+    __tablename__ = "pipeline_stages"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    stage = Column(String(32), nullable=False)
+    key = Column(String(64), nullable=False, unique=True)
+    parent_id = Column(Integer, ForeignKey("pipeline_stages.id"))
+    grid_id = Column(Integer, ForeignKey("grids.id"))
+    count = Column(Integer, nullable=False, default=0)
+    complete = Column(Boolean, nullable=False, default=False)
+
+    parent = relationship("PipelineStage", remote_side=[id])
+    grid = relationship("Grid")
+    sectors = relationship("Sector", back_populates="stage")
+
+    def __repr__(self):
+        return f"PipelineStage<id={self.id}, stage={self.stage}, key={self.key[:12]}>"
 
 
 class Sector(Base):
@@ -115,12 +172,14 @@ class Sector(Base):
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     vertex_id = Column(Integer, ForeignKey("vertices.id"), nullable=False)
+    stage_id = Column(Integer, ForeignKey("pipeline_stages.id"), index=True)
     azimuth = Column(Integer, nullable=False)
     radius = Column(Integer, nullable=False)
     angle = Column(Integer, nullable=False)
     polygon = Column(Geometry("Polygon", srid=4326), nullable=False)
 
     vertex = relationship("Vertex", back_populates="sectors")
+    stage = relationship("PipelineStage", back_populates="sectors")
     vertex_intersections = relationship("SectorVertexIntersection", back_populates="sector")
 
     def __repr__(self):
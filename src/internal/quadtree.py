@@ -0,0 +1,83 @@
+from dataclasses import dataclass
+
+import numpy as np
+import shapely
+from shapely.geometry.base import BaseGeometry
+
+from internal.columnar import GridCells
+
+
+@dataclass
+class ClassificationStats:
+    block_tests: int = 0
+    cell_tests: int = 0
+    accepted_blocks: int = 0
+    rejected_blocks: int = 0
+
+    @property
+    def geos_calls(self) -> int:
+        return self.block_tests + self.cell_tests
+
+
+class QuadtreeClassifier:
+    def __init__(self, area: BaseGeometry, leaf_size: int = 4):
+        self.area = area
+        self.leaf_size = leaf_size
+        self.stats = ClassificationStats()
+        shapely.prepare(self.area)
+
+    def classify(self, cells: GridCells, start: int = 0, stop: int = None) -> np.ndarray:
+        if stop is None:
+            stop = cells.columns
+        xs, ys = cells.xs, cells.ys
+        mask = np.zeros((stop - start, cells.rows), dtype=bool)
+        blocks = np.array([[start, stop, 0, cells.rows]], dtype=np.int64)
+        leaves = []
+
+        while len(blocks):
+            i0, i1, j0, j1 = blocks.T
+            boxes = shapely.box(xs[i0], ys[j0], xs[i1], ys[j1])
+            inside = shapely.contains(self.area, boxes)
+            outside = ~inside & ~shapely.intersects(self.area, boxes)
+            self.stats.block_tests += 2 * len(blocks)
+            self.stats.accepted_blocks += int(inside.sum())
+            self.stats.rejected_blocks += int(outside.sum())
+
+            for a, b, c, d in blocks[inside].tolist():
+                mask[a - start:b - start, c:d] = True
+
+            boundary = blocks[~inside & ~outside]
+            small = ((boundary[:, 1] - boundary[:, 0]) <= self.leaf_size) & \
+                    ((boundary[:, 3] - boundary[:, 2]) <= self.leaf_size)
+            leaves.append(boundary[small])
+            blocks = self._split(boundary[~small])
+
+        leaves = np.concatenate(leaves) if leaves else np.empty((0, 4), dtype=np.int64)
+        if len(leaves):
+            i, j = self._leaf_cells(leaves)
+            matching = shapely.contains(self.area, shapely.box(xs[i], ys[j], xs[i + 1], ys[j + 1]))
+            self.stats.cell_tests += len(i)
+            mask[i[matching] - start, j[matching]] = True
+
+        return mask.ravel()
+
+    @staticmethod
+    def _split(blocks: np.ndarray) -> np.ndarray:
+        i0, i1, j0, j1 = blocks.T
+        im, jm = (i0 + i1 + 1) // 2, (j0 + j1 + 1) // 2
+        children = np.concatenate([
+            np.column_stack([i0, im, j0, jm]),
+            np.column_stack([im, i1, j0, jm]),
+            np.column_stack([i0, im, jm, j1]),
+            np.column_stack([im, i1, jm, j1])
+        ])
+        return children[(children[:, 1] > children[:, 0]) & (children[:, 3] > children[:, 2])]
+
+    @staticmethod
+    def _leaf_cells(leaves: np.ndarray):
+        widths, heights = leaves[:, 1] - leaves[:, 0], leaves[:, 3] - leaves[:, 2]
+        counts = widths * heights
+        leaf = np.repeat(np.arange(len(leaves)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        di, dj = np.divmod(offsets, heights[leaf])
+        return leaves[leaf, 0] + di, leaves[leaf, 2] + dj
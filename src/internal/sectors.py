@@ -0,0 +1,156 @@
+import math
+from typing import Dict, List, Tuple
+
+import numpy as np
+import shapely
+
+from pkg.config import EARTH_RADIUS
+from pkg.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def find_points_on_sphere(lon: np.ndarray, lat: np.ndarray, azimuth: np.ndarray,
+                          distance: float = 5) -> Tuple[np.ndarray, np.ndarray]:
+    lat1 = np.radians(lat)
+    lon1 = np.radians(lon)
+    azimuth = np.radians(azimuth)
+
+    delta = distance / EARTH_RADIUS
+
+    lat2 = np.arcsin(np.sin(lat1) * np.cos(delta) +
+                     np.cos(lat1) * np.sin(delta) * np.cos(azimuth))
+
+    lon2 = lon1 + np.arctan2(np.sin(azimuth) * np.sin(delta) * np.cos(lat1),
+                             np.cos(delta) - np.sin(lat1) * np.sin(lat2))
+
+    lat2 = np.degrees(lat2)
+    lon2 = np.degrees(lon2)
+
+    lon2 = (lon2 + 180) % 360 - 180
+
+    return lon2, lat2
+
+
+def distance_error(lon: np.ndarray, lat: np.ndarray, expected_lon: np.ndarray, expected_lat: np.ndarray) -> np.ndarray:
+    dx = np.radians(lon - expected_lon) * np.cos(np.radians(expected_lat))
+    dy = np.radians(lat - expected_lat)
+    return np.hypot(dx, dy) * EARTH_RADIUS * 1000
+
+
+class SectorTemplateCache:
+    def __init__(self, max_error: float = 1, max_band: float = 0.01):
+        self.max_error = max_error
+        self.max_band = max_band
+        self._templates: Dict[Tuple[float, float, float, int, float, int], np.ndarray | None] = {}
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+    @property
+    def fallbacks(self) -> int:
+        return sum(template is None for template in self._templates.values())
+
+    def band_width(self, radius: float, latitude: float) -> float:
+        # Moving a template by d radians of latitude shifts its far arc east-west by about
+        # radius * tan(latitude) * d, so the width keeps that shift within half the error bound.
+        slope = radius * 1000 * math.tan(math.radians(min(abs(latitude), 89)))
+        if slope * math.radians(self.max_band) <= self.max_error / 2:
+            return self.max_band
+        return 2.0 ** math.floor(math.log2(math.degrees(self.max_error / slope)))
+
+    def _build(self, bearings: np.ndarray, radius: float, band: float, band_index: int) -> np.ndarray | None:
+        center_lat = (band_index + 0.5) * band
+        lon, lat = find_points_on_sphere(np.zeros_like(bearings), np.full_like(bearings, center_lat), bearings, radius)
+        offsets = np.column_stack([lon, lat - center_lat])
+
+        error = 0
+        for edge_lat in (band_index * band, (band_index + 1) * band):
+            expected_lon, expected_lat = find_points_on_sphere(
+                np.zeros_like(bearings), np.full_like(bearings, edge_lat), bearings, radius
+            )
+            deviation = distance_error(offsets[:, 0], offsets[:, 1] + edge_lat, expected_lon, expected_lat)
+            error = max(error, deviation.max())
+
+        if error > self.max_error:
+            logger.debug(f"Sector template for latitude band {band_index} exceeds the error bound "
+                         f"({error:.2f} m > {self.max_error:.2f} m), falling back to exact computation")
+            return None
+        return offsets
+
+    def get(self, azimuth: float, radius: float, angle: float, arc_offsets: np.ndarray,
+            band: float, band_index: int) -> np.ndarray | None:
+        key = (float(azimuth), float(radius), float(angle), len(arc_offsets), band, band_index)
+        if key not in self._templates:
+            self._templates[key] = self._build(azimuth + arc_offsets, radius, band, band_index)
+        return self._templates[key]
+
+
+class SectorBuilder:
+    MIN_BAND_VERTICES = 8
+
+    def __init__(self, radius: float = 5, angle: float = 60, resolution: float = 1,
+                 templates: SectorTemplateCache = None):
+        self.radius = radius
+        self.angle = angle
+        self.resolution = resolution
+        self.templates = templates
+
+    @property
+    def arc_offsets(self) -> np.ndarray:
+        samples = int(round(self.angle / self.resolution)) + 1
+        return np.linspace(-self.angle / 2, self.angle / 2, samples)
+
+    def arcs(self, coordinates: np.ndarray, azimuths: List[float]) -> np.ndarray:
+        coordinates = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+        if self.templates is not None:
+            return self._template_arcs(coordinates, azimuths)
+        return self._exact_arcs(coordinates, azimuths)
+
+    def _exact_arcs(self, coordinates: np.ndarray, azimuths: List[float]) -> np.ndarray:
+        bearings = np.asarray(azimuths, dtype=np.float64)[:, None] + self.arc_offsets[None, :]
+        lon, lat = find_points_on_sphere(
+            coordinates[:, 0, None, None], coordinates[:, 1, None, None], bearings[None, :, :], self.radius
+        )
+        return np.stack([lon, lat], axis=-1)
+
+    def _template_arcs(self, coordinates: np.ndarray, azimuths: List[float]) -> np.ndarray:
+        arc_offsets = self.arc_offsets
+        band = self.templates.band_width(self.radius, np.abs(coordinates[:, 1]).max(initial=0))
+        band_indices, inverse = np.unique(
+            np.floor(coordinates[:, 1] / band).astype(np.int64), return_inverse=True
+        )
+        if len(band_indices) * self.MIN_BAND_VERTICES > len(coordinates):
+            return self._exact_arcs(coordinates, azimuths)
+
+        offsets = np.zeros((len(band_indices), len(azimuths), len(arc_offsets), 2))
+        exact = np.zeros((len(band_indices), len(azimuths)), dtype=bool)
+        for b, band_index in enumerate(band_indices.tolist()):
+            for k, azimuth in enumerate(azimuths):
+                template = self.templates.get(azimuth, self.radius, self.angle, arc_offsets, band, band_index)
+                if template is None:
+                    exact[b, k] = True
+                else:
+                    offsets[b, k] = template
+
+        arcs = offsets[inverse]
+        arcs += coordinates[:, None, None, :]
+        if np.abs(arcs[..., 0]).max(initial=0) > 180:
+            arcs[..., 0] = (arcs[..., 0] + 180) % 360 - 180
+        if exact.any():
+            order = np.argsort(inverse, kind="stable")
+            bounds = np.searchsorted(inverse[order], np.arange(len(band_indices) + 1))
+            for b in np.flatnonzero(exact.any(axis=1)):
+                in_band = order[bounds[b]:bounds[b + 1]]
+                columns = np.flatnonzero(exact[b])
+                arcs[in_band[:, None], columns] = self._exact_arcs(
+                    coordinates[in_band], [azimuths[k] for k in columns]
+                )
+        return arcs
+
+    def build(self, coordinates: np.ndarray, azimuths: List[float]) -> np.ndarray:
+        coordinates = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+        arcs = self.arcs(coordinates, azimuths)
+        centers = np.broadcast_to(coordinates[:, None, None, :], (len(coordinates), len(azimuths), 1, 2))
+        rings = np.concatenate([centers, arcs, centers], axis=2)
+        return shapely.polygons(rings.reshape(-1, rings.shape[2], 2))
@@ -0,0 +1,148 @@
+import math
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Iterator, List, Tuple
+
+import numpy as np
+import shapely
+from shapely.geometry.base import BaseGeometry
+
+from internal.intersection import IntersectionEngine
+from internal.columnar import GridCells, SectorSet
+from internal.quadtree import QuadtreeClassifier
+from internal.sectors import SectorBuilder, SectorTemplateCache
+from pkg.config import EARTH_RADIUS
+from pkg.logger import get_logger
+from pkg.metrics import timed
+
+logger = get_logger(__name__)
+
+_CLASSIFIER: QuadtreeClassifier | None = None
+_TEMPLATES: SectorTemplateCache | None = None
+
+
+@dataclass
+class StripResult:
+    start: int
+    stop: int
+    is_matching: np.ndarray
+    sector_vertices: np.ndarray
+    sector_azimuths: np.ndarray
+    sector_polygons: np.ndarray
+    intersection_sectors: np.ndarray
+    intersection_vertices: np.ndarray
+
+
+def _initialize_worker(area_wkb: bytes):
+    global _CLASSIFIER, _TEMPLATES
+    _CLASSIFIER = QuadtreeClassifier(shapely.from_wkb(area_wkb))
+    _TEMPLATES = SectorTemplateCache()
+
+
+def halo_columns(cells: GridCells, radius: float) -> int:
+    delta = math.degrees(radius / EARTH_RADIUS)
+    max_lat = min(max(abs(cells.origin_y), abs(cells.origin_y + cells.rows * cells.step_y)) + delta, 89)
+    return int(math.ceil(delta / math.cos(math.radians(max_lat)) / cells.step_x)) + 1
+
+
+def _matching_vertex_columns(cells: GridCells, is_matching: np.ndarray, start: int, stop: int) -> np.ndarray:
+    padded = np.zeros((stop - start + 2, cells.rows + 2), dtype=bool)
+    padded[1:-1, 1:-1] = is_matching.reshape(stop - start, cells.rows)
+    return padded[:-1, :-1] | padded[1:, :-1] | padded[:-1, 1:] | padded[1:, 1:]
+
+
+def compute_strip(cells: GridCells, start: int, stop: int, azimuths: List[int], radius: float,
+                  angle: float) -> StripResult:
+    halo = halo_columns(cells, radius)
+    classified_start, classified_stop = max(0, start - halo - 1), min(cells.columns, stop + halo + 1)
+    is_matching = _CLASSIFIER.classify(cells, classified_start, classified_stop)
+    vertex_flags = _matching_vertex_columns(cells, is_matching, classified_start, classified_stop)
+
+    def matching_vertices(first_column: int, last_column: int) -> np.ndarray:
+        flags = vertex_flags[first_column - classified_start:last_column - classified_start + 1]
+        column, row = np.nonzero(flags)
+        return (column + first_column) * (cells.rows + 1) + row
+
+    owned_stop = stop if stop < cells.columns else cells.columns + 1
+    owned = matching_vertices(start, owned_stop - 1)
+    candidates = matching_vertices(max(0, start - halo), min(cells.columns, stop + halo))
+
+    polygons = SectorBuilder(radius, angle, templates=_TEMPLATES).build(cells.vertex_coordinates_at(owned), azimuths)
+    engine = IntersectionEngine(candidates, cells.vertex_coordinates_at(candidates))
+    intersection_sectors, intersection_vertices = engine.intersect(np.arange(len(polygons)), polygons)
+
+    return StripResult(
+        start=start,
+        stop=stop,
+        is_matching=is_matching[(start - classified_start) * cells.rows:(stop - classified_start) * cells.rows],
+        sector_vertices=np.repeat(owned, len(azimuths)),
+        sector_azimuths=np.tile(azimuths, len(owned)),
+        sector_polygons=shapely.to_wkb(polygons),
+        intersection_sectors=intersection_sectors,
+        intersection_vertices=intersection_vertices
+    )
+
+
+class ShardedPipeline:
+    def __init__(self, area: BaseGeometry, workers: int = None, strips: int = None, strip_columns: int = None):
+        self.area = area
+        self.workers = workers or os.cpu_count()
+        self.strips = strips or self.workers * 4
+        self.strip_columns = strip_columns
+
+    def _bounds(self, cells: GridCells) -> List[Tuple[int, int]]:
+        if self.strip_columns:
+            edges = np.append(np.arange(0, cells.columns, self.strip_columns), cells.columns)
+        else:
+            edges = np.linspace(0, cells.columns, min(self.strips, cells.columns) + 1).round().astype(int)
+        return [(start, stop) for start, stop in zip(edges[:-1].tolist(), edges[1:].tolist()) if stop > start]
+
+    def iter_strips(self, cells: GridCells, azimuths: List[int] = None, radius: float = 5,
+                    angle: float = 60) -> Iterator[StripResult]:
+        if not azimuths:
+            azimuths = [0, 120, 240]
+        lattice = replace(cells, is_matching=np.empty(0, dtype=bool))
+        bounds = self._bounds(cells)
+
+        if self.workers == 1:
+            _initialize_worker(shapely.to_wkb(self.area))
+            for start, stop in bounds:
+                yield compute_strip(lattice, start, stop, azimuths, radius, angle)
+            return
+
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_initialize_worker,
+                                 initargs=(shapely.to_wkb(self.area),)) as executor:
+            pending = deque()
+            for start, stop in bounds:
+                pending.append(executor.submit(compute_strip, lattice, start, stop, azimuths, radius, angle))
+                if len(pending) >= self.workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    @timed("sharded_run")
+    def run(self, cells: GridCells, azimuths: List[int] = None, radius: float = 5,
+            angle: float = 60) -> Tuple[GridCells, SectorSet, np.ndarray, np.ndarray]:
+        start = time.time()
+        strips = list(self.iter_strips(cells, azimuths, radius, angle))
+        offsets = np.cumsum([0] + [len(strip.sector_polygons) for strip in strips])
+
+        cells = replace(cells, is_matching=np.concatenate([strip.is_matching for strip in strips]))
+        sectors = SectorSet(
+            vertex_ids=np.concatenate([strip.sector_vertices for strip in strips]),
+            azimuths=np.concatenate([strip.sector_azimuths for strip in strips]),
+            radius=radius,
+            angle=angle,
+            polygons=shapely.from_wkb(np.concatenate([strip.sector_polygons for strip in strips]))
+        )
+        sector_index = np.concatenate([
+            strip.intersection_sectors + offset for strip, offset in zip(strips, offsets.tolist())
+        ])
+        vertex_index = np.concatenate([strip.intersection_vertices for strip in strips])
+        end = time.time()
+        logger.info(f"Sharded pipeline over {len(strips)} strips with {self.workers} workers "
+                    f"took {end - start:.2f} seconds")
+        return cells, sectors, sector_index, vertex_index
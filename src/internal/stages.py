@@ -0,0 +1,52 @@
+from enum import Enum
+from typing import Callable, Tuple
+
+from internal.models import PipelineStage
+from internal.storage import StorageBackend
+from pkg.cache import ResultCache
+from pkg.logger import get_logger
+from pkg.metrics import timer
+
+logger = get_logger(__name__)
+
+
+class Stage(Enum):
+    BOUNDARY = "boundary"
+    GRID = "grid"
+    SECTORS = "sectors"
+    INTERSECTIONS = "intersections"
+
+
+def stage_key(stage: Stage, *parts) -> str:
+    return ResultCache.key(stage.value, *parts)
+
+
+class StageStore:
+    def __init__(self, db: StorageBackend):
+        self.db = db
+
+    def run(self, stage: Stage, key: str, compute: Callable[[PipelineStage], Tuple[int, int]],
+            parent: PipelineStage = None) -> PipelineStage:
+        model = self.db.get_stage(key)
+        if model is not None and model.complete:
+            logger.info(f"Stage {stage.value} {key[:12]} reused with {model.count} items")
+            return model
+
+        with self.db.stage_lock(key):
+            model = self.db.get_stage(key)
+            if model is not None and model.complete:
+                logger.info(f"Stage {stage.value} {key[:12]} computed by another worker with {model.count} items")
+                return model
+
+            if model is None:
+                self.db.create_stage(PipelineStage(stage=stage.value, key=key, parent_id=parent.id if parent else None,
+                                                   grid_id=parent.grid_id if parent else None))
+                model = self.db.get_stage(key)
+            else:
+                logger.warning(f"Stage {stage.value} {key[:12]} was left incomplete and is recomputed")
+
+            with timer("pipeline", step=stage.value):
+                count, grid_id = compute(model)
+            self.db.complete_stage(model, count, grid_id)
+        logger.info(f"Stage {stage.value} {key[:12]} computed with {count} items")
+        return model
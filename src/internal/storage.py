@@ -0,0 +1,178 @@
+from abc import ABC, abstractmethod
+from contextlib import AbstractContextManager
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+from internal.columnar import GridCells, SectorSet
+from internal.models import Feature, Grid, PipelineStage, Sector, SectorVertexIntersection, Square, Vertex
+from pkg.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class StorageBackend(ABC):
+    SUPPORTS_TILES = False
+
+    @abstractmethod
+    def create_grid(self, model: Grid) -> int:
+        ...
+
+    @abstractmethod
+    def create_square(self, model: Square) -> int:
+        ...
+
+    @abstractmethod
+    def create_vertex(self, model: Vertex) -> int:
+        ...
+
+    @abstractmethod
+    def create_sector(self, model: Sector) -> int:
+        ...
+
+    @abstractmethod
+    def create_sector_vertex_intersection(self, model: SectorVertexIntersection):
+        ...
+
+    @abstractmethod
+    def create_feature(self, model: Feature) -> int:
+        ...
+
+    @abstractmethod
+    def bulk_insert_vertices(self, grid_id: int, vertex_i: np.ndarray, vertex_j: np.ndarray,
+                             coordinates: np.ndarray, batch_size: int = 10000) -> np.ndarray:
+        ...
+
+    @abstractmethod
+    def bulk_insert_squares(self, grid_id: int, square_i: np.ndarray, square_j: np.ndarray, is_matching: np.ndarray,
+                            corner_ids: np.ndarray, batch_size: int = 10000) -> np.ndarray:
+        ...
+
+    @abstractmethod
+    def bulk_insert_sectors(self, sectors: SectorSet, batch_size: int = 10000) -> np.ndarray:
+        ...
+
+    @abstractmethod
+    def bulk_insert_intersections(self, sector_ids: np.ndarray, vertex_ids: np.ndarray, batch_size: int = 100000):
+        ...
+
+    def bulk_insert_grid(self, grid: Grid, cells: GridCells, batch_size: int = 10000,
+                         stage: PipelineStage = None) -> Tuple[np.ndarray, np.ndarray]:
+        grid_id = self.create_grid(grid)
+        if grid_id is None:
+            raise RuntimeError(f"Failed to create a grid of {len(cells)} squares")
+        try:
+            if stage is not None:
+                self.assign_stage_grid(stage, grid_id)
+            vertex_ids = self.bulk_insert_vertices(
+                grid_id, cells.vertex_i, cells.vertex_j, cells.vertex_coordinates, batch_size
+            )
+            square_ids = self.bulk_insert_squares(
+                grid_id, cells.i, cells.j, cells.is_matching, vertex_ids[cells.corner_indices], batch_size
+            )
+        except Exception:
+            self.delete_grid(grid_id)
+            raise
+        logger.debug(f"Grid {grid_id} with {len(cells)} squares and {cells.vertex_count} vertices inserted")
+        return square_ids, vertex_ids
+
+    @abstractmethod
+    def get_all_features(self) -> List[Feature]:
+        ...
+
+    @abstractmethod
+    def get_all_grids(self) -> List[Grid]:
+        ...
+
+    @abstractmethod
+    def get_all_squares(self) -> List[Square]:
+        ...
+
+    @abstractmethod
+    def get_all_sectors(self) -> List[Sector]:
+        ...
+
+    @abstractmethod
+    def get_square_by_vertex_id(self, vertex_id: int) -> Square | None:
+        ...
+
+    @abstractmethod
+    def get_grid(self, grid_id: int) -> Grid | None:
+        ...
+
+    @abstractmethod
+    def iter_squares(self, grid_id: int, matching_only: bool = False,
+                     batch_size: int = 10000) -> Iterator[List[Square]]:
+        ...
+
+    @abstractmethod
+    def get_grid_cells(self, grid_id: int) -> GridCells | None:
+        ...
+
+    @abstractmethod
+    def get_sector_set(self, grid_id: int, stage_id: int = None) -> SectorSet | None:
+        ...
+
+    @abstractmethod
+    def get_vertex_arrays(self, grid_id: int, matching_only: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        ...
+
+    @abstractmethod
+    def get_lattice_vertex_ids(self, grid_id: int) -> np.ndarray:
+        ...
+
+    @abstractmethod
+    def get_intersection_arrays(self, grid_id: int, stage_id: int = None) -> Tuple[np.ndarray, np.ndarray]:
+        ...
+
+    @abstractmethod
+    def compute_intersections(self, grid_id: int = None, chunk_size: int = 50000, workers: int = 1) -> int:
+        ...
+
+    @abstractmethod
+    def delete_all_features(self):
+        ...
+
+    @abstractmethod
+    def delete_all_squares(self):
+        ...
+
+    @abstractmethod
+    def delete_all_sectors(self):
+        ...
+
+    @abstractmethod
+    def delete_all_vertices(self):
+        ...
+
+    @abstractmethod
+    def delete_grid(self, grid_id: int):
+        ...
+
+    @abstractmethod
+    def get_stage(self, key: str) -> PipelineStage | None:
+        ...
+
+    @abstractmethod
+    def stage_lock(self, key: str) -> AbstractContextManager:
+        ...
+
+    @abstractmethod
+    def create_stage(self, model: PipelineStage) -> int:
+        ...
+
+    @abstractmethod
+    def assign_stage_grid(self, model: PipelineStage, grid_id: int):
+        ...
+
+    @abstractmethod
+    def complete_stage(self, model: PipelineStage, count: int, grid_id: int = None):
+        ...
+
+    @abstractmethod
+    def delete_stage_intersections(self, stage_id: int):
+        ...
+
+    @abstractmethod
+    def delete_stage_sectors(self, stage_id: int):
+        ...
@@ -1,18 +1,28 @@
 import datetime
+import json
 import random
 from pathlib import Path
 from typing import List, Tuple
 
 import folium
-from folium.plugins import Fullscreen
+import shapely
+from folium.plugins import Fullscreen, VectorGridProtobuf
 from shapely import Point
 
-from internal.models import Square, ExtremePoint, Direction, Sector
+from internal.columnar import GridCells, SectorSet
+from internal.models import Square, ExtremePoint, Direction
 from pkg.config import CENTER_LAT, CENTER_LON
 from pkg.logger import get_logger
 
 logger = get_logger(__name__)
 
+TILE_STYLES = {
+    "squares": "function(properties) { return {color: properties.is_matching ? 'green' : 'red', weight: 1}; }",
+    "vertices": "{radius: 2, color: 'white', weight: 1}",
+    "sectors": "function(properties) { return {color: ['red', 'green', 'blue', 'yellow', 'orange', 'purple', "
+               "'pink'][properties.id % 7], weight: 1, fill: true, fillOpacity: 0.5}; }"
+}
+
 
 class GeoVisualizer:
     def __init__(self, zoom_start: int = 6):
@@ -41,6 +51,20 @@ class GeoVisualizer:
             ).add_to(group)
         group.add_to(self.map)
 
+    def add_grid_cells(self, cells: GridCells, matching: bool = True, color: str = None):
+        if not color:
+            color = "green" if matching else "red"
+        group = folium.FeatureGroup(name=color.capitalize() + " grid", show=matching)
+        indices = cells.matches if matching else cells.not_matches
+        folium.GeoJson(
+            data=shapely.geometry.mapping(shapely.multipolygons(cells.boxes[indices])),
+            style_function=lambda x: {
+                "color": color,
+                "weight": 1,
+            }
+        ).add_to(group)
+        group.add_to(self.map)
+
     def add_extreme_points(self, extreme_points: Tuple[ExtremePoint, ExtremePoint, ExtremePoint, ExtremePoint]):
         group = folium.FeatureGroup(name="Extreme points", show=False)
         for extreme_point in extreme_points:
@@ -89,17 +113,40 @@ class GeoVisualizer:
             }
         ).add_to(self.map)
 
-    def add_sectors(self, sectors: List[Sector]):
+    def add_sectors(self, sectors: SectorSet, tolerance: float = None):
+        polygons = sectors.polygons if tolerance is None else shapely.simplify(sectors.polygons, tolerance)
         group = folium.FeatureGroup(name="Sectors", show=True)
-        for sector in sectors:
-            folium.Polygon(
-                locations=[(c[1], c[0]) for c in sector.shapely_polygon.exterior.coords],
-                color=random.choice(["red", "green", "blue", "yellow", "orange", "purple", "pink"]),
-                weight=1,
-                fill_opacity=0.5
-            ).add_to(group)
+        folium.GeoJson(
+            data={
+                "type": "FeatureCollection",
+                "features": [
+                    {"type": "Feature", "properties": {}, "geometry": json.loads(geometry)}
+                    for geometry in shapely.to_geojson(polygons).tolist()
+                ]
+            },
+            style_function=lambda x: {
+                "color": random.choice(["red", "green", "blue", "yellow", "orange", "purple", "pink"]),
+                "weight": 1,
+                "fillOpacity": 0.5,
+            }
+        ).add_to(group)
         group.add_to(self.map)
 
+    def add_vector_tiles(self, url: str, layer: str, style: str, show: bool = True):
+        VectorGridProtobuf(
+            url,
+            layer.capitalize(),
+            "{\"vectorTileLayerStyles\": {\"" + layer + "\": " + style + "}}",
+            show=show
+        ).add_to(self.map)
+
+    def add_grid_tiles(self, grid_id: int, stage_id: int = None):
+        for layer, style in TILE_STYLES.items():
+            url = f"/tiles/{layer}/{{z}}/{{x}}/{{y}}.pbf?grid={grid_id}"
+            if layer == "sectors" and stage_id is not None:
+                url += f"&stage={stage_id}"
+            self.add_vector_tiles(url, layer, style, show=layer != "vertices")
+
     def add_controls(self):
         folium.LayerControl().add_to(self.map)
         Fullscreen().add_to(self.map)
@@ -2,8 +2,12 @@ from pathlib import Path
 
 from internal.analyzer import GeoAnalyzer
 from internal.database import DatabaseConnector
-from internal.models import SectorVertexIntersection
+from internal.intersection import IntersectionEngine
 from pkg.config import settings
+from pkg.logger import get_logger
+from pkg.metrics import registry
+
+logger = get_logger(__name__)
 
 
 def main():
@@ -15,15 +19,14 @@ def main():
     analyzer = GeoAnalyzer(geojson_path, db)
 
     grid = analyzer.generate_grid(100)
-    sectors = analyzer.generate_sectors_for_squares(grid.matches, radius=100)
-
-    for sector in sectors:
-        for square in grid.matches:
-            for is_intersecting, vertex in sector.check_square_vertices_intersection(square):
-                if is_intersecting:
-                    db.create_sector_vertex_intersection(
-                        SectorVertexIntersection(sector_id=sector.id, vertex_id=vertex.id)
-                    )
+    vertex_ids, vertex_coordinates = db.get_vertex_arrays(grid.id)
+    sectors = analyzer.generate_sectors(vertex_ids, vertex_coordinates, radius=100)
+
+    engine = IntersectionEngine(vertex_ids, vertex_coordinates)
+    db.bulk_insert_intersections(*engine.intersect(sectors.ids, sectors.polygons))
+
+    if settings.METRICS_ENABLED:
+        logger.info(f"Metrics summary:\n{registry.report()}")
 
 
 if __name__ == "__main__":
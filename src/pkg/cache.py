@@ -0,0 +1,105 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Hashable, Tuple
+
+from pkg.logger import get_logger
+
+logger = get_logger(__name__)
+
+_FILE_HASHES: Dict[Tuple[str, int, int], str] = {}
+
+
+def file_hash(path: Path) -> str:
+    stat = path.stat()
+    key = (str(path.resolve()), stat.st_mtime_ns, stat.st_size)
+    if key not in _FILE_HASHES:
+        with open(path, "rb") as file:
+            _FILE_HASHES[key] = hashlib.file_digest(file, "sha256").hexdigest()
+    return _FILE_HASHES[key]
+
+
+class LRUCache:
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class ResultCache:
+    def __init__(self, directory: Path, max_entries: int = 32, max_bytes: int = 512 * 1024 * 1024,
+                 suffix: str = ".html"):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._entries = LRUCache(max_entries)
+        self._lock = threading.Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(*parts) -> str:
+        return hashlib.sha256("|".join(map(str, parts)).encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}{self.suffix}"
+
+    def get(self, key: str) -> Path | None:
+        with self._lock:
+            path = self._entries.get(key)
+            if path and path.exists():
+                os.utime(path)
+                return path
+
+            path = self._path(key)
+            if not path.exists():
+                self._entries.pop(key)
+                return None
+
+            os.utime(path)
+            self._entries.put(key, path)
+            logger.debug(f"Result {key} loaded from disk cache")
+            return path
+
+    def put(self, key: str, source: Path) -> Path:
+        with self._lock:
+            path = self._path(key)
+            Path(source).replace(path)
+            self._entries.put(key, path)
+            self._evict()
+            logger.debug(f"Result {key} cached")
+            return path
+
+    def _evict(self):
+        files = sorted(self.directory.glob(f"*{self.suffix}"), key=lambda file: file.stat().st_mtime)
+        total = sum(file.stat().st_size for file in files)
+        for file in files:
+            if total <= self.max_bytes:
+                break
+            total -= file.stat().st_size
+            file.unlink(missing_ok=True)
+            self._entries.pop(file.name.removesuffix(self.suffix))
+            logger.debug(f"Result {file.name} evicted from disk cache")
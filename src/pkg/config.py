@@ -11,6 +11,19 @@ class Settings(BaseSettings):
     POSTGRES_USER: str
     POSTGRES_PASSWORD: str
     FLASK_PORT: int = 8080
+    MAP_CACHE_ENTRIES: int = 32
+    MAP_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    TILE_CACHE_ENTRIES: int = 4096
+    JOB_WORKERS: int = 2
+    JOB_STATE_TTL: float = 3600
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    LOG_LEVEL: str = "INFO"
+    METRICS_ENABLED: bool = False
+    PROFILE_DIR: str | None = None
+    PROFILE_SAMPLE_RATE: float = 1.0
 
     model_config = ConfigDict()
 
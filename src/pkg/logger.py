@@ -1,10 +1,12 @@
 import logging
 from pathlib import Path
 
+from pkg.config import settings
+
 
 def get_logger(name: str) -> logging.Logger:
     logger = logging.getLogger(name)
-    logger.setLevel(logging.DEBUG)
+    logger.setLevel(settings.LOG_LEVEL.upper())
 
     if not logger.handlers:
         formatter = logging.Formatter(
@@ -0,0 +1,242 @@
+import cProfile
+import itertools
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from pkg.config import settings
+from pkg.logger import get_logger
+
+logger = get_logger(__name__)
+
+_DISABLED = nullcontext()
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, object]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + "}"
+
+
+class MetricsRegistry:
+    def __init__(self, prefix: str = "geo"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = defaultdict(lambda: defaultdict(float))
+        self._summaries: Dict[str, Dict[Labels, List[float]]] = defaultdict(dict)
+
+    def describe(self, name: str, kind: str, description: str):
+        self._help[name] = (kind, description)
+
+    def increment(self, name: str, value: float = 1, **labels):
+        key = _labels(labels)
+        with self._lock:
+            self._counters[name][key] += value
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = _labels(labels)
+        with self._lock:
+            summary = self._summaries[name].get(key)
+            if summary is None:
+                self._summaries[name][key] = [1, seconds, seconds]
+            else:
+                summary[0] += 1
+                summary[1] += seconds
+                summary[2] = max(summary[2], seconds)
+
+    def merge(self, counters: Dict[str, Dict[Labels, float]], summaries: Dict[str, Dict[Labels, List[float]]]):
+        with self._lock:
+            for name, values in counters.items():
+                for key, value in values.items():
+                    self._counters[name][key] += value
+            for name, values in summaries.items():
+                for key, (count, total, maximum) in values.items():
+                    summary = self._summaries[name].get(key)
+                    if summary is None:
+                        self._summaries[name][key] = [count, total, maximum]
+                    else:
+                        summary[0] += count
+                        summary[1] += total
+                        summary[2] = max(summary[2], maximum)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._summaries.clear()
+
+    def snapshot(self) -> Tuple[Dict[str, Dict[Labels, float]], Dict[str, Dict[Labels, List[float]]]]:
+        with self._lock:
+            counters = {name: dict(values) for name, values in self._counters.items()}
+            summaries = {name: {key: list(value) for key, value in values.items()}
+                         for name, values in self._summaries.items()}
+        return counters, summaries
+
+    def render(self) -> str:
+        counters, summaries = self.snapshot()
+        lines = []
+        for name, values in sorted(counters.items()):
+            metric = f"{self.prefix}_{name}"
+            lines.append(f"# HELP {metric} {self._help.get(name, ('', name))[1]}")
+            lines.append(f"# TYPE {metric} counter")
+            lines.extend(f"{metric}{_format_labels(key)} {value:g}" for key, value in sorted(values.items()))
+        for name, values in sorted(summaries.items()):
+            metric = f"{self.prefix}_{name}"
+            lines.append(f"# HELP {metric} {self._help.get(name, ('', name))[1]}")
+            lines.append(f"# TYPE {metric} summary")
+            for key, (count, total, _) in sorted(values.items()):
+                lines.append(f"{metric}_count{_format_labels(key)} {count:g}")
+                lines.append(f"{metric}_sum{_format_labels(key)} {total:.6f}")
+            lines.append(f"# HELP {metric}_max Longest observation of {metric}")
+            lines.append(f"# TYPE {metric}_max gauge")
+            lines.extend(f"{metric}_max{_format_labels(key)} {maximum:.6f}"
+                         for key, (_, _, maximum) in sorted(values.items()))
+        return "\n".join(lines) + "\n"
+
+    def report(self) -> str:
+        counters, summaries = self.snapshot()
+        lines = []
+        for name, values in sorted(summaries.items()):
+            for key, (count, total, maximum) in sorted(values.items(), key=lambda item: -item[1][1]):
+                lines.append(f"{name}{_format_labels(key)}: {count:g} calls, {total:.3f} s total, "
+                             f"{total / count * 1000:.2f} ms mean, {maximum * 1000:.2f} ms max")
+        for name, values in sorted(counters.items()):
+            lines.extend(f"{name}{_format_labels(key)}: {value:g}" for key, value in sorted(values.items()))
+        return "\n".join(lines)
+
+
+# Each process has its own registry. JobManager merges a job's metrics into the parent once the job finishes;
+# ShardedPipeline strip workers are not merged, their time shows up as sharded_run in the calling process.
+registry = MetricsRegistry()
+registry.describe("stage_seconds", "summary", "Wall time spent in instrumented pipeline stages")
+registry.describe("db_statement_seconds", "summary", "Wall time spent executing SQL statements by statement type")
+registry.describe("db_copy_bytes_total", "counter", "Bytes streamed to PostgreSQL with COPY by table")
+registry.describe("db_commits_total", "counter", "Committed database transactions by connection kind")
+registry.describe("db_rollbacks_total", "counter", "Rolled back database transactions by connection kind")
+registry.describe("profiles_total", "counter", "Stage calls captured with cProfile")
+
+_profile_counter = itertools.count()
+_profiling = threading.local()
+
+
+def _profile_path(name: str) -> Path:
+    directory = Path(settings.PROFILE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory / f"{name}-{os.getpid()}-{next(_profile_counter)}.prof"
+
+
+@contextmanager
+def _timed(name: str, labels: Dict[str, object]):
+    profiler = None
+    if settings.PROFILE_DIR and not getattr(_profiling, "active", False) and \
+            random.random() < settings.PROFILE_SAMPLE_RATE:
+        profiler = cProfile.Profile()
+        _profiling.active = True
+        profiler.enable()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        registry.observe("stage_seconds", elapsed, stage=name, **labels)
+        if profiler is not None:
+            profiler.disable()
+            _profiling.active = False
+            path = _profile_path(name)
+            profiler.dump_stats(path)
+            registry.increment("profiles_total", stage=name)
+            logger.info(f"Profile of {name} ({elapsed:.2f} seconds) written to {path}")
+
+
+def timer(name: str, **labels):
+    if not settings.METRICS_ENABLED:
+        return _DISABLED
+    return _timed(name, labels)
+
+
+def timed(name: str = None) -> Callable:
+    def decorator(fn: Callable) -> Callable:
+        if not settings.METRICS_ENABLED:
+            return fn
+        stage = name or fn.__qualname__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _timed(stage, {}):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def observe_copy(table: str, size: int, seconds: float):
+    if settings.METRICS_ENABLED:
+        registry.observe("db_statement_seconds", seconds, type="COPY")
+        registry.increment("db_copy_bytes_total", size, table=table)
+
+
+def count_commit(connection: str = "raw"):
+    if settings.METRICS_ENABLED:
+        registry.increment("db_commits_total", connection=connection)
+
+
+def count_rollback(connection: str = "raw"):
+    if settings.METRICS_ENABLED:
+        registry.increment("db_rollbacks_total", connection=connection)
+
+
+def _statement_type(statement: str) -> str:
+    words = statement.lstrip().split(None, 1)
+    return words[0].upper() if words else "EMPTY"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["metrics_started"].pop()
+    registry.observe("db_statement_seconds", elapsed, type=_statement_type(statement))
+
+
+def _handle_error(context):
+    started = context.connection.info.get("metrics_started") if context.connection is not None else None
+    if started:
+        elapsed = time.perf_counter() - started.pop()
+        registry.observe("db_statement_seconds", elapsed, type=_statement_type(context.statement or ""),
+                         status="error")
+
+
+def _commit(conn):
+    registry.increment("db_commits_total", connection="engine")
+
+
+def _rollback(conn):
+    registry.increment("db_rollbacks_total", connection="engine")
+
+
+def instrument_engine(engine: Engine):
+    if not settings.METRICS_ENABLED:
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+    event.listen(engine, "commit", _commit)
+    event.listen(engine, "rollback", _rollback)
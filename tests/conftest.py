@@ -0,0 +1,22 @@
+import os
+from pathlib import Path
+
+import pytest
+
+os.environ.setdefault("POSTGRES_DB", "test")
+os.environ.setdefault("POSTGRES_USER", "test")
+os.environ.setdefault("POSTGRES_PASSWORD", "test")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+GEOJSON_DIR = Path(__file__).parent.parent / "resources/geojson"
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+
+@pytest.fixture(scope="session", autouse=True)
+def boundary_cache_dir(tmp_path_factory) -> Path:
+    from internal.boundary import boundaries
+
+    directory = tmp_path_factory.mktemp("boundaries")
+    boundaries.directory = directory
+    return directory
@@ -0,0 +1,36 @@
+import shapely
+
+from conftest import GEOJSON_DIR
+from internal.boundary import BoundaryCache
+
+GEOJSON = GEOJSON_DIR / "UKR-ADM1_simplified.geojson"
+
+
+def test_cold_load_writes_the_disk_cache(tmp_path):
+    boundary = BoundaryCache(tmp_path).load(GEOJSON)
+
+    assert (tmp_path / f"{boundary.digest}.wkb").exists()
+    assert len(boundary.features) == 27
+
+
+def test_disk_cache_restores_the_same_area(tmp_path):
+    cold = BoundaryCache(tmp_path).load(GEOJSON)
+    warm = BoundaryCache(tmp_path).load(GEOJSON)
+
+    assert warm is not cold
+    assert shapely.equals_exact(warm.area, cold.area, 0)
+    assert warm.bounds == cold.bounds
+
+
+def test_simplified_variants_are_shared_through_the_disk_cache(tmp_path):
+    cold = BoundaryCache(tmp_path).load(GEOJSON).simplified(0.01)
+    level = BoundaryCache(tmp_path).load(GEOJSON).level(0.01)
+
+    assert len(list(tmp_path.glob(f"*.{level}.wkb"))) == 1
+    assert shapely.equals_exact(BoundaryCache(tmp_path).load(GEOJSON).simplified(0.01), cold, 0)
+
+
+def test_memory_cache_returns_the_loaded_boundary(tmp_path):
+    cache = BoundaryCache(tmp_path)
+
+    assert cache.load(GEOJSON) is cache.load(GEOJSON)
@@ -0,0 +1,81 @@
+import math
+from contextlib import contextmanager
+from typing import Iterator, List
+
+import numpy as np
+import pytest
+from sqlalchemy import event
+
+from conftest import TEST_DATABASE_URL
+from internal.columnar import GridCells
+from internal.database import DatabaseConnector
+
+pytestmark = pytest.mark.skipif(TEST_DATABASE_URL is None, reason="TEST_DATABASE_URL is not set to a PostGIS database")
+
+PAGE_SIZE = 100
+CORNER_LOADS = 4
+
+
+@pytest.fixture
+def database():
+    db = DatabaseConnector(TEST_DATABASE_URL, pool_size=1)
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def create_grid(database):
+    grid_ids = []
+
+    def create(columns: int, rows: int) -> int:
+        cells = GridCells(size=1, origin_x=30, origin_y=48, step_x=0.01, step_y=0.01, columns=columns, rows=rows,
+                          is_matching=np.arange(columns * rows) % 3 != 0)
+        grid = cells.to_model()
+        database.bulk_insert_grid(grid, cells)
+        grid_ids.append(grid.id)
+        database.remove_session()
+        return grid.id
+
+    yield create
+    for grid_id in grid_ids:
+        database.delete_grid(grid_id)
+
+
+@contextmanager
+def count_statements(db: DatabaseConnector) -> Iterator[List[str]]:
+    statements = []
+
+    def record(connection, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+
+
+@pytest.mark.parametrize("columns, rows", [(5, 4), (30, 30)])
+def test_get_grid_walks_polygons_in_three_statements(database, create_grid, columns, rows):
+    grid_id = create_grid(columns, rows)
+
+    with count_statements(database) as statements:
+        grid = database.get_grid(grid_id)
+        polygons = [square.shapely_polygon for square in grid.matches]
+
+    assert len(polygons) == np.count_nonzero(np.arange(columns * rows) % 3 != 0)
+    assert len(statements) == 3, statements
+
+
+@pytest.mark.parametrize("columns, rows", [(5, 4), (30, 30)])
+def test_iter_squares_statements_per_page(database, create_grid, columns, rows):
+    grid_id = create_grid(columns, rows)
+
+    with count_statements(database) as statements:
+        pages = 0
+        for squares in database.iter_squares(grid_id, batch_size=PAGE_SIZE):
+            pages += 1
+            assert all(square.shapely_polygon.is_valid for square in squares)
+
+    assert pages == math.ceil(columns * rows / PAGE_SIZE)
+    assert len(statements) <= pages * (1 + CORNER_LOADS) + 1, statements
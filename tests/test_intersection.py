@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+import shapely
+
+from conftest import GEOJSON_DIR
+from internal.analyzer import GeoAnalyzer
+from internal.columnar import SectorSet
+from internal.intersection import IntersectionEngine, LatticeIntersectionEngine
+from internal.sectors import SectorBuilder
+
+AZIMUTHS = [0, 120, 240]
+
+
+def _pairs(result) -> set:
+    return set(zip(*(values.tolist() for values in result)))
+
+
+@pytest.fixture(scope="module")
+def lattice():
+    analyzer = GeoAnalyzer(GEOJSON_DIR / "UKR-ADM0_simplified.geojson", None)
+    cells = analyzer.compute_grid(10)
+    matching = cells.matching_vertices
+    return cells, matching + 1, cells.vertex_coordinates[matching]
+
+
+@pytest.mark.parametrize("radius", [15, 25])
+def test_lattice_engine_matches_polygon_containment(lattice, radius):
+    cells, vertex_ids, vertex_coordinates = lattice
+    sectors = SectorSet(
+        vertex_ids=np.repeat(vertex_ids, len(AZIMUTHS)),
+        azimuths=np.tile(AZIMUTHS, len(vertex_ids)),
+        radius=radius,
+        angle=60,
+        polygons=SectorBuilder(radius, 60).build(vertex_coordinates, AZIMUTHS),
+        ids=np.arange(1, len(vertex_ids) * len(AZIMUTHS) + 1)
+    )
+    expected = _pairs(IntersectionEngine(vertex_ids, vertex_coordinates).intersect(sectors.ids, sectors.polygons))
+    engine = LatticeIntersectionEngine(cells, vertex_ids, vertex_coordinates)
+
+    with_polygons = _pairs(engine.intersect_sector_set(sectors))
+    centers = np.repeat(vertex_coordinates, len(AZIMUTHS), axis=0)
+    analytic = _pairs(engine.intersect(sectors.ids, centers, sectors.azimuths, radius, 60))
+
+    assert expected
+    assert with_polygons == expected
+    assert analytic == expected
+    assert engine.fallbacks < len(expected)
+
+
+def test_analytic_test_agrees_with_point_in_polygon(lattice):
+    cells, vertex_ids, vertex_coordinates = lattice
+    rng = np.random.default_rng(0)
+    centers = vertex_coordinates[rng.choice(len(vertex_coordinates), 200, replace=False)]
+    azimuths = rng.uniform(0, 360, len(centers))
+    polygons = np.concatenate([SectorBuilder(25, 60).build(center, [azimuth])
+                               for center, azimuth in zip(centers, azimuths)])
+    engine = LatticeIntersectionEngine(cells, vertex_ids, vertex_coordinates)
+
+    sector_ids, intersected = engine.intersect(np.arange(len(centers)), centers, azimuths, 25, 60)
+
+    expected = shapely.contains_xy(polygons[:, None], vertex_coordinates[None, :, 0], vertex_coordinates[None, :, 1])
+    actual = np.zeros_like(expected)
+    actual[sector_ids, np.searchsorted(vertex_ids, intersected)] = True
+    np.testing.assert_array_equal(actual, expected)
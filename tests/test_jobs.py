@@ -0,0 +1,47 @@
+import time
+from concurrent.futures import wait
+
+from internal.jobs import JobManager, JobStatus
+
+
+def _sleep(progress, seconds: float) -> float:
+    time.sleep(seconds)
+    return seconds
+
+
+def _wait(jobs: JobManager, job_id: str, timeout: float = 10) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        state = jobs.status(job_id)
+        if state["status"] not in (JobStatus.PENDING.value, JobStatus.RUNNING.value):
+            return state
+        time.sleep(0.05)
+    raise TimeoutError(job_id)
+
+
+def test_cancelled_job_is_marked_cancelled():
+    jobs = JobManager(workers=1)
+    try:
+        running = jobs.submit("running", _sleep, 0.5)
+        queued = jobs.submit("queued", _sleep, 0.5)
+        jobs._futures[queued].cancel()
+
+        assert _wait(jobs, queued)["status"] == JobStatus.CANCELLED.value
+        assert _wait(jobs, running) == {"id": running, "status": JobStatus.DONE.value, "result": 0.5}
+    finally:
+        jobs.shutdown()
+
+
+def test_jobs_ending_after_shutdown_are_ignored(caplog):
+    jobs = JobManager(workers=1)
+    job_id = jobs.submit("job", _sleep, 0.5)
+    future = jobs._futures[job_id]
+    while jobs.status(job_id)["status"] != JobStatus.RUNNING.value:
+        time.sleep(0.01)
+
+    jobs.shutdown()
+    wait([future], timeout=10)
+
+    assert future.done()
+    assert jobs.status(job_id) is None
+    assert "exception calling callback" not in caplog.text
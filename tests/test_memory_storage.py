@@ -0,0 +1,51 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from internal.columnar import GridCells
+from internal.memory import MemoryStorage
+
+
+def _cells() -> GridCells:
+    return GridCells(size=1, origin_x=30, origin_y=48, step_x=0.01, step_y=0.01, columns=3, rows=2,
+                     is_matching=np.array([True, False, True, True, False, True]))
+
+
+def test_square_lookup_before_squares_are_inserted():
+    storage = MemoryStorage()
+    cells = _cells()
+    grid_id = storage.create_grid(cells.to_model())
+    vertex_ids = storage.bulk_insert_vertices(grid_id, cells.vertex_i, cells.vertex_j, cells.vertex_coordinates)
+
+    assert storage.get_square_by_vertex_id(int(vertex_ids[0])) is None
+
+    storage.bulk_insert_squares(grid_id, cells.i, cells.j, cells.is_matching, vertex_ids[cells.corner_indices])
+    square = storage.get_square_by_vertex_id(int(vertex_ids[0]))
+    assert (square.i, square.j) == (0, 0)
+
+
+def test_square_lookup_matches_the_lattice_neighbours():
+    storage = MemoryStorage()
+    cells = _cells()
+    square_ids, vertex_ids = storage.bulk_insert_grid(cells.to_model(), cells)
+
+    for vertex_id, i, j in zip(vertex_ids.tolist(), cells.vertex_i.tolist(), cells.vertex_j.tolist()):
+        square = storage.get_square_by_vertex_id(vertex_id)
+        assert (square.i, square.j) == (min(i, cells.columns - 1), min(j, cells.rows - 1))
+        assert vertex_id in [vertex.id for vertex in square.vertices]
+
+
+def test_concurrent_bulk_inserts_reserve_distinct_ids():
+    storage = MemoryStorage()
+    cells = _cells()
+    grid_id = storage.create_grid(cells.to_model())
+
+    def insert(_):
+        return storage.bulk_insert_vertices(grid_id, cells.vertex_i, cells.vertex_j, cells.vertex_coordinates)
+
+    with ThreadPoolExecutor(8) as executor:
+        inserted = np.concatenate(list(executor.map(insert, range(200))))
+
+    vertex_ids, _ = storage.get_vertex_arrays(grid_id, matching_only=False)
+    assert len(np.unique(inserted)) == len(inserted) == 200 * cells.vertex_count
+    np.testing.assert_array_equal(np.sort(vertex_ids), np.sort(inserted))
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+import shapely
+
+from conftest import GEOJSON_DIR
+from internal.analyzer import GeoAnalyzer
+from internal.quadtree import QuadtreeClassifier
+
+
+@pytest.fixture(scope="module", params=["UKR-ADM0_simplified.geojson", "UKR-ADM1_simplified.geojson"])
+def analyzer(request) -> GeoAnalyzer:
+    return GeoAnalyzer(GEOJSON_DIR / request.param, None)
+
+
+@pytest.mark.parametrize("grid_size", [10, 3])
+def test_quadtree_matches_per_cell_containment(analyzer, grid_size):
+    cells = analyzer.lattice(grid_size)
+    area = analyzer._COMBINED_AREA
+    classifier = QuadtreeClassifier(area)
+
+    mask = classifier.classify(cells)
+
+    np.testing.assert_array_equal(mask, shapely.contains(area, cells.boxes))
+    assert classifier.stats.geos_calls < len(cells)
+
+
+def test_rejected_blocks_do_not_intersect_the_area(analyzer):
+    cells = analyzer.lattice(10)
+    area = analyzer._COMBINED_AREA
+
+    mask = QuadtreeClassifier(area, leaf_size=1).classify(cells)
+
+    touching = shapely.intersects(area, cells.boxes)
+    assert not mask[~touching].any()
+    assert touching[mask].all()
+
+
+def test_column_strips_match_the_full_mask(analyzer):
+    cells = analyzer.lattice(10)
+    classifier = QuadtreeClassifier(analyzer._COMBINED_AREA)
+    full = classifier.classify(cells)
+
+    strips = [classifier.classify(cells, start, min(start + 37, cells.columns))
+              for start in range(0, cells.columns, 37)]
+
+    np.testing.assert_array_equal(np.concatenate(strips), full)
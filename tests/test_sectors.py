@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from internal.columnar import GridCells
+from internal.sectors import SectorBuilder, SectorTemplateCache, distance_error
+
+AZIMUTHS = [0, 120, 240]
+
+
+def _coordinates() -> np.ndarray:
+    cells = GridCells(size=1, origin_x=22, origin_y=44, step_x=0.05, step_y=0.05, columns=160, rows=170,
+                      is_matching=np.ones(160 * 170, dtype=bool))
+    return cells.vertex_coordinates
+
+
+def _deviation(approximate: np.ndarray, exact: np.ndarray) -> float:
+    return distance_error(approximate[..., 0], approximate[..., 1], exact[..., 0], exact[..., 1]).max()
+
+
+@pytest.mark.parametrize("radius", [5, 20, 100])
+def test_template_arcs_stay_within_the_error_bound(radius):
+    coordinates = _coordinates()
+    templates = SectorTemplateCache(max_error=1)
+
+    approximate = SectorBuilder(radius, templates=templates).arcs(coordinates, AZIMUTHS)
+    exact = SectorBuilder(radius).arcs(coordinates, AZIMUTHS)
+
+    assert len(templates) > 0
+    assert templates.fallbacks == 0
+    assert _deviation(approximate, exact) <= 1
+
+
+def test_templates_over_the_error_bound_fall_back_to_exact_arcs():
+    coordinates = _coordinates()
+    templates = SectorTemplateCache(max_error=1e-6, max_band=1)
+    templates.band_width = lambda radius, latitude: 1
+
+    approximate = SectorBuilder(100, templates=templates).arcs(coordinates, AZIMUTHS)
+    exact = SectorBuilder(100).arcs(coordinates, AZIMUTHS)
+
+    assert templates.fallbacks == len(templates)
+    np.testing.assert_allclose(approximate, exact)
+
+
+def test_sparse_bands_use_exact_arcs():
+    coordinates = np.random.default_rng(0).uniform([22, 44], [40, 52], size=(2000, 2))
+    templates = SectorTemplateCache(max_error=1)
+
+    approximate = SectorBuilder(100, templates=templates).arcs(coordinates, AZIMUTHS)
+
+    assert len(templates) == 0
+    np.testing.assert_allclose(approximate, SectorBuilder(100).arcs(coordinates, AZIMUTHS))
@@ -0,0 +1,77 @@
+import threading
+import time
+import uuid
+
+import pytest
+
+from conftest import TEST_DATABASE_URL
+from internal.database import DatabaseConnector
+from internal.memory import MemoryStorage
+from internal.models import PipelineStage
+from internal.stages import Stage, StageStore, stage_key
+
+
+def _postgis():
+    if TEST_DATABASE_URL is None:
+        pytest.skip("TEST_DATABASE_URL is not set to a PostGIS database")
+    return DatabaseConnector(TEST_DATABASE_URL)
+
+
+@pytest.fixture(params=["memory", "postgis"])
+def storage_factory(request):
+    if request.param == "memory":
+        storage = MemoryStorage()
+        yield lambda: storage
+        return
+
+    connectors = []
+
+    def connect():
+        connectors.append(_postgis())
+        return connectors[-1]
+
+    yield connect
+    for connector in connectors:
+        connector.close()
+
+
+def test_concurrent_runs_compute_a_stage_once(storage_factory):
+    key = stage_key(Stage.BOUNDARY, uuid.uuid4().hex)
+    calls = []
+
+    def compute(stage):
+        calls.append(stage.id)
+        time.sleep(0.2)
+        return 1, None
+
+    stores = [StageStore(storage_factory()) for _ in range(2)]
+    results = [None, None]
+
+    def run(index: int):
+        results[index] = stores[index].run(Stage.BOUNDARY, key, compute)
+
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results[0].id == results[1].id == calls[0]
+    assert results[0].complete and results[1].complete
+
+
+def test_stage_deletes_reject_a_missing_stage_id(storage_factory):
+    storage = storage_factory()
+    with pytest.raises(ValueError):
+        storage.delete_stage_sectors(None)
+    with pytest.raises(ValueError):
+        storage.delete_stage_intersections(None)
+
+
+def test_create_stage_raises_on_a_taken_key(storage_factory):
+    storage = storage_factory()
+    key = stage_key(Stage.BOUNDARY, uuid.uuid4().hex)
+    storage.create_stage(PipelineStage(stage=Stage.BOUNDARY.value, key=key))
+    with pytest.raises(RuntimeError):
+        storage.create_stage(PipelineStage(stage=Stage.BOUNDARY.value, key=key))
@@ -0,0 +1,36 @@
+import gc
+import tracemalloc
+
+from conftest import GEOJSON_DIR
+from internal.analyzer import GeoAnalyzer
+from internal.memory import MemoryStorage
+
+GEOJSON = GEOJSON_DIR / "UKR-ADM0_simplified.geojson"
+CHUNK_SIZE = 2000
+TOLERANCE = 1.5
+
+
+def _working_peak(grid_size: float) -> tuple:
+    storage = MemoryStorage()
+    analyzer = GeoAnalyzer(GEOJSON, storage)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        analyzer.generate_streaming(grid_size, chunk_size=CHUNK_SIZE, workers=1)
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return len(storage.get_grid_cells(1)), peak - retained
+
+
+def test_streaming_peak_does_not_grow_with_grid_size():
+    GeoAnalyzer(GEOJSON, MemoryStorage()).generate_streaming(40, chunk_size=CHUNK_SIZE)
+
+    small_squares, small_peak = _working_peak(20)
+    large_squares, large_peak = _working_peak(10)
+
+    assert large_squares >= 3.5 * small_squares
+    assert large_peak <= TOLERANCE * small_peak, (
+        f"{large_squares} squares peaked {large_peak / 2 ** 20:.1f} MB above the stored rows, "
+        f"{small_squares} squares {small_peak / 2 ** 20:.1f} MB"
+    )